@@ -0,0 +1,338 @@
+"""
+Retries, circuit breaking and rate limiting for Azure Document Intelligence
+One AzureCallGuard per process wraps every analyze call: a token bucket keeps
+submissions under the resource's transactions-per-second limit, transient
+failures are retried with jittered exponential backoff that honours
+Retry-After, and a circuit breaker fails calls fast while Azure is unhealthy.
+The OCR service awaits calls with ``call_async``; the blob organizer
+(scripts/edu_blob_organizer/docint_guard.py) makes blocking ones with ``call``.
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+except ImportError:
+    ServiceRequestError = ServiceResponseError = None
+
+logger = logging.getLogger(__name__)
+
+# Throttling, timeouts and server-side failures; other 4xx are the caller's
+# fault and retrying them cannot help
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# 429 means Azure is healthy but busy, so it is retried without counting
+# towards the breaker
+BREAKER_STATUSES = RETRY_STATUSES - {429}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Azure while the circuit breaker is open"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Azure is unavailable (circuit open)")
+        self.retry_after = retry_after
+
+
+def status_code(e: Exception) -> Optional[int]:
+    return getattr(e, "status_code", None)
+
+
+def is_connection_error(e: Exception) -> bool:
+    connection_errors = tuple(
+        cls for cls in (ServiceRequestError, ServiceResponseError) if cls is not None
+    )
+    return isinstance(e, (ConnectionError,) + connection_errors)
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Delay requested by Azure's retry-after-ms or Retry-After headers, if any"""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Client-side limit of ``rate`` calls per second with bursts of ``burst``
+
+    Callers reserve a token and wait out the returned delay, so waiters are
+    spaced 1/rate apart instead of all retrying at once. A rate of 0 disables
+    the limit. Thread-safe; shared by every caller in the process.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def reserve(self) -> float:
+        """Take a token; returns the seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            delay = max(delay, self._paused_until - now)
+            self.waited_seconds += delay
+            return delay
+
+    def pause(self, seconds: float):
+        """Hold every caller back after Azure answered 429 with Retry-After"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures
+
+    While open, calls raise CircuitOpen without reaching Azure. After
+    ``reset_seconds`` one probe call is let through (half-open): success
+    closes the circuit, failure opens it for another ``reset_seconds``.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def retry_after(self) -> int:
+        remaining = self._opened_at + self.reset_seconds - time.monotonic()
+        return max(1, round(remaining))
+
+    def check(self):
+        """Raise CircuitOpen if a call would be rejected now, without probing"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now < self._opened_at + self.reset_seconds:
+                raise CircuitOpen(self.retry_after())
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                if time.monotonic() < self._opened_at + self.reset_seconds:
+                    self.rejected += 1
+                    raise CircuitOpen(self.retry_after())
+                self.state = "half_open"
+            if self._probing:
+                # Another call is already testing whether Azure recovered
+                self.rejected += 1
+                raise CircuitOpen(1)
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Azure circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._probing = False
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    logger.warning(
+                        f"Azure circuit opened for {self.reset_seconds:.0f}s "
+                        f"after {self._failures} failures"
+                    )
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about Azure's health (e.g. cancelled)"""
+        with self._lock:
+            self._probing = False
+
+
+class AzureCallGuard:
+    """Token bucket, retries with backoff and a circuit breaker around calls
+
+    ``call`` and ``call_async`` run one Azure request (an analyze submission,
+    or polling it to the end) up to ``max_retries`` + 1 times; they differ
+    only in how they wait.
+    A Retry-After longer than ``max_delay`` is not waited for; the error is
+    raised instead.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(5, 30.0)
+        self.bucket = bucket or TokenBucket(0, 1)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls, processes: int = 1) -> "AzureCallGuard":
+        """Settings from AZURE_* variables; AZURE_TPS is split over ``processes``"""
+        tps = float(os.getenv("AZURE_TPS", "15")) / max(1, processes)
+        return cls(
+            max_retries=int(os.getenv("AZURE_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("AZURE_RETRY_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("AZURE_RETRY_MAX_SECONDS", "20")),
+            breaker=CircuitBreaker(
+                int(os.getenv("AZURE_BREAKER_FAILURES", "5")),
+                float(os.getenv("AZURE_BREAKER_RESET_SECONDS", "30")),
+            ),
+            bucket=TokenBucket(
+                tps, int(os.getenv("AZURE_TPS_BURST", "0")) or max(1, round(tps))
+            ),
+        )
+
+    def _backoff(self, attempt: int, e: Exception) -> Optional[float]:
+        """Seconds to wait before retrying ``e``, or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+        status = status_code(e)
+        if status not in RETRY_STATUSES and not is_connection_error(e):
+            return None
+        requested = retry_after_seconds(e)
+        if status == 429:
+            self.throttled += 1
+            if requested:
+                self.bucket.pause(requested)
+        if requested is not None:
+            if requested > self.max_delay:
+                return None
+            # Spread the callers released by the same Retry-After
+            return requested + random.uniform(0, self.base_delay)
+        # Full jitter: anywhere up to the exponential ceiling
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _failed(self, attempt: int, e: Exception) -> Optional[float]:
+        """Record a failed attempt; returns the delay before the next, or None"""
+        self.failures += 1
+        if status_code(e) in BREAKER_STATUSES or is_connection_error(e):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        delay = self._backoff(attempt, e)
+        if delay is not None:
+            self.retries += 1
+            logger.warning(
+                f"Azure call failed ({status_code(e) or type(e).__name__}), "
+                f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+            )
+        return delay
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` under the guard, blocking while it waits"""
+        self.calls += 1
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def call_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` under the guard; ``fn`` must return a coroutine"""
+        self.calls += 1
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire_async()
+            self.breaker.before_call()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled, e.g. by the caller's timeout
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "circuit_rejected": self.breaker.rejected,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "max_retries": self.max_retries,
+            "tps": self.bucket.rate,
+            "rate_limit_wait_seconds": round(self.bucket.waited_seconds, 3),
+        }
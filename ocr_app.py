@@ -4,63 +4,859 @@ OCR Service for Cardiology Suite
 Provides document text extraction and medical form processing
 """
 
+if __name__ == "__main__":
+    # Hand over to the launcher before the app is imported: it imports the app
+    # itself once the workers' shared state (metrics directory, jobs database)
+    # is set up. OCR_WORKERS / --workers N runs N pre-forked server processes.
+    from ocr_server import main
+
+    main()
+    raise SystemExit(0)
+
+import asyncio
+import math
 import os
 import logging
-from fastapi import FastAPI, File, UploadFile, HTTPException
-import pytesseract
-from PIL import Image
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Response
+from PIL import Image, UnidentifiedImageError
+from pdf2image import (
+    convert_from_bytes,
+    convert_from_path,
+    pdfinfo_from_bytes,
+    pdfinfo_from_path,
+)
+from pdf2image.exceptions import PDFPageCountError, PDFSyntaxError
 import cv2
 import numpy as np
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-import uvicorn
+
+from azure_resilience import (
+    AzureCallGuard,
+    CircuitOpen,
+    retry_after_seconds,
+    status_code,
+)
+from ocr_cache import OCRCache, cache_key
+from ocr_executor import ExecutorSaturated, ExecutorUnavailable, OCRExecutor
+from ocr_jobs import PRIORITIES, Job, JobQueueFull, JobScheduler
+import ocr_metrics
+from ocr_metrics import MetricsMiddleware, observe_stage, stage
+from ocr_preprocess import parse_stages, run_pipeline
+from ocr_profiles import (
+    Profile,
+    engine_name,
+    filter_words,
+    image_to_data,
+    image_to_string,
+    load_profiles,
+)
+from ocr_read import (
+    READ_DETAILS,
+    page_text,
+    paragraphs_by_page,
+    raw_analyze_result,
+    read_page_data,
+)
+from ocr_tables import TABLE_FORMATS, format_tables, table_grid, tables_by_page
+from ocr_streaming import stream_events, validate_stream_format
+from ocr_uploads import (
+    Source,
+    Upload,
+    UploadSizeLimitMiddleware,
+    extract_zip,
+    is_zip,
+    open_source,
+    read_head,
+    read_upload,
+    source_buffer,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="Cardiology Suite OCR Service", version="1.0.0")
-
 # Azure Form Recognizer configuration
 FORM_RECOGNIZER_ENDPOINT = os.getenv(
     "FORM_RECOGNIZER_ENDPOINT",
     "https://cardiologysuite-ocr.cognitiveservices.azure.com/",
 )
 FORM_RECOGNIZER_KEY = os.getenv("FORM_RECOGNIZER_KEY", "")
+AZURE_MAX_CONCURRENCY = int(os.getenv("AZURE_MAX_CONCURRENCY", "16"))
+AZURE_TIMEOUT_SECONDS = float(os.getenv("AZURE_TIMEOUT_SECONDS", "120"))
+# Streamed Azure responses analyze this many pages per request so early pages
+# are emitted while later chunks are still running
+AZURE_STREAM_CHUNK_PAGES = int(os.getenv("AZURE_STREAM_CHUNK_PAGES", "4"))
+# Retries, circuit breaker and client-side TPS limit for every analysis
+# (AZURE_MAX_RETRIES, AZURE_RETRY_BASE_SECONDS, AZURE_RETRY_MAX_SECONDS,
+# AZURE_BREAKER_FAILURES, AZURE_BREAKER_RESET_SECONDS, AZURE_TPS,
+# AZURE_TPS_BURST); pre-forked workers split AZURE_TPS between them
+azure_guard = AzureCallGuard.from_env(processes=int(os.getenv("OCR_WORKERS", "1")))
+# While the circuit is open, Azure requests get 503 ("fail") or are answered
+# by Tesseract ("tesseract"); streamed requests always get 503
+AZURE_BREAKER_FALLBACK = os.getenv("AZURE_BREAKER_FALLBACK", "fail").lower()
 
-# Initialize Azure clients
+# Shared async client (one connection pool for the app's lifetime), created
+# in the lifespan hook when a key is configured
 form_recognizer_client = None
-if FORM_RECOGNIZER_KEY:
+azure_semaphore = asyncio.Semaphore(AZURE_MAX_CONCURRENCY)
+azure_in_flight = 0
+
+# Process pool for CPU-bound OCR work (OCR_POOL_WORKERS, OCR_POOL_MAX_QUEUE,
+# OCR_JOB_TIMEOUT_SECONDS)
+ocr_executor = OCRExecutor.from_env()
+
+# Result cache keyed by file hash + engine/model + preprocessing parameters
+# (OCR_CACHE_MAX_BYTES, OCR_CACHE_TTL_SECONDS, OCR_CACHE_DB)
+ocr_cache = OCRCache.from_env()
+
+# Background jobs for long analyses (OCR_JOB_WORKERS, OCR_JOB_MAX_QUEUE,
+# OCR_JOB_TTL_SECONDS, OCR_JOBS_DB)
+job_scheduler = JobScheduler.from_env(describe_error=lambda e: error_detail(e))
+
+# Uploads: bodies over OCR_MAX_UPLOAD_BYTES are rejected with 413 while
+# reading; files over OCR_UPLOAD_SPOOL_BYTES are spooled to OCR_UPLOAD_DIR
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+OCR_UPLOAD_SPOOL_BYTES = int(os.getenv("OCR_UPLOAD_SPOOL_BYTES", str(4 * 1024 * 1024)))
+OCR_UPLOAD_DIR = os.getenv("OCR_UPLOAD_DIR") or None
+# Batches: total request size and number of files (zip members count)
+OCR_BATCH_MAX_BYTES = int(os.getenv("OCR_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "100"))
+# Allowance for multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Add a Server-Timing header with per-stage durations to every response
+OCR_SERVER_TIMING = os.getenv("OCR_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+# With several server workers, how often each one copies its executor, cache
+# and job tallies into the shared metrics directory
+OCR_METRICS_INTERVAL_SECONDS = float(os.getenv("OCR_METRICS_INTERVAL_SECONDS", "5"))
+
+# Preprocessing stages used when a request does not pass ?preprocess=
+# (comma-separated names from ocr_preprocess.STAGES)
+OCR_PREPROCESS_STAGES = parse_stages(os.getenv("OCR_PREPROCESS_STAGES"))
+
+# Tesseract profiles selectable with ?profile= (ocr_profiles.PROFILES plus
+# JSON definitions in OCR_TESSERACT_PROFILES); OCR_TESSERACT_PROFILE is used
+# when a request does not name one
+TESSERACT_PROFILES = load_profiles(os.getenv("OCR_TESSERACT_PROFILES"))
+OCR_TESSERACT_PROFILE = TESSERACT_PROFILES[
+    os.getenv("OCR_TESSERACT_PROFILE", "default")
+]
+
+# /ocr/auto keeps the Tesseract result when the mean word confidence (0-100)
+# and recognised characters per megapixel reach these, else it asks Azure
+OCR_AUTO_MIN_CONFIDENCE = float(os.getenv("OCR_AUTO_MIN_CONFIDENCE", "75"))
+OCR_AUTO_MIN_DENSITY = float(os.getenv("OCR_AUTO_MIN_DENSITY", "50"))
+
+# Multi-page documents: PDFs are rasterised at OCR_PDF_DPI (capped by
+# OCR_MAX_DPI) and documents over OCR_MAX_PAGES are rejected
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "50"))
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", "300"))
+
+# Run a tiny OCR job in every pool process at startup so the first real
+# request does not pay for process spawn, imports and Tesseract's data load
+OCR_WARMUP = os.getenv("OCR_WARMUP", "1").lower() not in ("0", "false", "no")
+# "pending" -> "running" -> "ready" | "failed"; "skipped" when disabled
+warmup_state: Dict[str, Any] = {"status": "pending", "seconds": None, "error": None}
+
+
+def warmup_image() -> bytes:
+    """A small PNG with a line of text, enough to exercise the whole pipeline"""
+    img = np.full((48, 200), 255, dtype=np.uint8)
+    cv2.putText(img, "BP 120/80", (8, 34), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+async def refresh_metrics():
+    """Keep this worker's mirrored metrics current for scrapes of other workers"""
+    while True:
+        ocr_metrics.REGISTRY.collect()
+        await asyncio.sleep(OCR_METRICS_INTERVAL_SECONDS)
+
+
+async def warm_up():
+    """Start every pool process and run Tesseract once in each"""
+    warmup_state.update(status="running", error=None)
+    started = time.perf_counter()
+    image = warmup_image()
     try:
-        form_recognizer_client = DocumentAnalysisClient(
-            endpoint=FORM_RECOGNIZER_ENDPOINT,
-            credential=AzureKeyCredential(FORM_RECOGNIZER_KEY),
+        # One job per worker: the pool spawns a process for each job that
+        # finds no idle worker, so this brings up the whole pool
+        await asyncio.gather(
+            *(
+                ocr_executor.run(
+                    run_tesseract_page,
+                    image,
+                    0,
+                    OCR_PDF_DPI,
+                    OCR_PREPROCESS_STAGES,
+                    OCR_TESSERACT_PROFILE,
+                )
+                for _ in range(ocr_executor.max_workers)
+            )
         )
-        logger.info("Azure Form Recognizer client initialized")
+        warmup_state["status"] = "ready"
     except Exception as e:
-        logger.error(f"Failed to initialize Azure Form Recognizer: {e}")
+        logger.error(f"OCR warm-up failed: {e}")
+        warmup_state.update(status="failed", error=str(e) or type(e).__name__)
+    warmup_state["seconds"] = round(time.perf_counter() - started, 3)
+    observe_stage("warmup", warmup_state["seconds"])
+    logger.info(f"OCR warm-up {warmup_state['status']} in {warmup_state['seconds']}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global form_recognizer_client
+
+    # Started here rather than at import so every pre-forked server worker
+    # gets its own pool, connections and scheduler (see ocr_server.py)
+    ocr_executor.start()
+    ocr_cache.open()
+    job_scheduler.start()
+    logger.info(
+        f"OCR executor started with {ocr_executor.max_workers} workers, "
+        f"queue depth {ocr_executor.max_queue}"
+    )
+
+    if FORM_RECOGNIZER_KEY:
+        try:
+            # The Azure SDK is only imported when it is going to be used
+            from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+            from azure.core.credentials import AzureKeyCredential
+
+            # Retries are left to azure_guard so attempts do not multiply
+            form_recognizer_client = DocumentAnalysisClient(
+                endpoint=FORM_RECOGNIZER_ENDPOINT,
+                credential=AzureKeyCredential(FORM_RECOGNIZER_KEY),
+                retry_total=0,
+            )
+            logger.info("Azure Form Recognizer client initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize Azure Form Recognizer: {e}")
+
+    warmup_task = None
+    if OCR_WARMUP:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        warmup_state["status"] = "skipped"
+    metrics_task = None
+    if ocr_metrics.MULTIPROCESS_DIR:
+        metrics_task = asyncio.create_task(refresh_metrics())
+
+    yield
+
+    for task in (warmup_task, metrics_task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if form_recognizer_client is not None:
+        await form_recognizer_client.close()
+        form_recognizer_client = None
+    await job_scheduler.shutdown()
+    ocr_executor.shutdown()
+    ocr_cache.close()
+
+
+# Initialize FastAPI app
+app = FastAPI(title="Cardiology Suite OCR Service", version="1.0.0", lifespan=lifespan)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=OCR_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    path_limits={"/ocr/batch": OCR_BATCH_MAX_BYTES + MULTIPART_OVERHEAD_BYTES},
+)
+# Added last so it is outermost and also times requests rejected for size
+app.add_middleware(
+    MetricsMiddleware, routes=app.router.routes, server_timing=OCR_SERVER_TIMING
+)
+
+
+async def receive_upload(file: UploadFile) -> Upload:
+    """Read an upload under the configured size limit and spool threshold"""
+    with stage("upload"):
+        upload = await read_upload(
+            file, OCR_MAX_UPLOAD_BYTES, OCR_UPLOAD_SPOOL_BYTES, OCR_UPLOAD_DIR
+        )
+    ocr_metrics.UPLOAD_BYTES.observe(upload.size)
+    return upload
+
+
+class UnreadableDocument(ValueError):
+    """A PDF, TIFF or image whose pages cannot be decoded (400)"""
+
+    status_code = 400
+
+
+class UnsupportedFormat(UnreadableDocument):
+    """An upload that is not a PDF, TIFF or an image format at all (415)"""
+
+    status_code = 415
+
+
+def detect_format(head: bytes) -> str:
+    """Classify an upload as pdf, tiff or a single raster image by its magic bytes"""
+    if head[:5] == b"%PDF-":
+        return "pdf"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    return "image"
+
+
+def count_pages(source: Source) -> int:
+    """Number of pages (PDF) or frames (TIFF) in a document"""
+    fmt = detect_format(read_head(source))
+    if fmt == "pdf":
+        try:
+            if isinstance(source, str):
+                return int(pdfinfo_from_path(source)["Pages"])
+            return int(pdfinfo_from_bytes(source)["Pages"])
+        except (PDFPageCountError, PDFSyntaxError) as e:
+            raise UnreadableDocument(f"Corrupt or unreadable PDF: {e}") from e
+    if fmt == "tiff":
+        try:
+            with Image.open(open_source(source)) as img:
+                return getattr(img, "n_frames", 1)
+        except (OSError, EOFError) as e:
+            raise UnreadableDocument("Corrupt or unreadable TIFF") from e
+    return 1
+
+
+def load_page(
+    source: Source, page_index: int, dpi: int
+) -> Tuple[np.ndarray, Optional[float]]:
+    """Decode a single page as a grayscale array, plus its DPI when known
+
+    ``source`` is the upload bytes or the path of its spool file; spool files
+    are read by poppler/PIL directly or memory-mapped, never copied whole.
+    """
+    fmt = detect_format(read_head(source))
+    if fmt == "pdf":
+        # Rasterise only the requested page so memory stays bounded
+        options = dict(
+            dpi=dpi, first_page=page_index + 1, last_page=page_index + 1, grayscale=True
+        )
+        try:
+            if isinstance(source, str):
+                pages = convert_from_path(source, **options)
+            else:
+                pages = convert_from_bytes(source, **options)
+        except (PDFPageCountError, PDFSyntaxError) as e:
+            raise UnreadableDocument(f"Corrupt or unreadable PDF: {e}") from e
+        if not pages:
+            raise UnreadableDocument(f"PDF page {page_index + 1} could not be rendered")
+        return np.asarray(pages[0].convert("L")), dpi
+    if fmt == "tiff":
+        try:
+            with Image.open(open_source(source)) as img:
+                img.seek(page_index)
+                return np.asarray(img.convert("L")), _image_dpi(img)
+        except (OSError, EOFError) as e:
+            raise UnreadableDocument("Corrupt or unreadable TIFF") from e
+
+    with source_buffer(source) as buffer:
+        img = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_GRAYSCALE)
+    try:
+        # Only the header is parsed; pixels were decoded by OpenCV above
+        with Image.open(open_source(source)) as header:
+            source_dpi = _image_dpi(header)
+    except UnidentifiedImageError:
+        if img is None:
+            raise UnsupportedFormat("Unsupported file type; expected a PDF or an image")
+        source_dpi = None
+    except Exception:
+        source_dpi = None
+    if img is None:
+        raise UnreadableDocument("Corrupt or unsupported image")
+    return img, source_dpi
+
+
+def _image_dpi(img: Image.Image) -> Optional[float]:
+    dpi = img.info.get("dpi")
+    return float(dpi[0]) if dpi and dpi[0] else None
+
+
+def run_tesseract_page(
+    source: Source,
+    page_index: int,
+    dpi: int,
+    stages: Tuple[str, ...],
+    profile: Profile,
+    words: bool = False,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Decode, preprocess and OCR one page (runs in a worker process)
+
+    Returns the page (text, plus word boxes in pixels of the preprocessed
+    image when ``words`` is set) and seconds spent per stage, which the
+    parent process records since metrics live there.
+    """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    gray, source_dpi = load_page(source, page_index, dpi)
+    timings["decode"] = time.perf_counter() - started
+    preprocess: Dict[str, float] = {}
+    processed = run_pipeline(gray, stages, source_dpi=source_dpi, timings=preprocess)
+    for name, seconds in preprocess.items():
+        timings[f"preprocess.{name}"] = seconds
+    started = time.perf_counter()
+    image = Image.fromarray(processed)
+    if words:
+        text, word_data = image_to_data(image, profile)
+        page = {"text": text, "width": image.width, "height": image.height}
+        page["words"] = word_data
+    else:
+        page = {"text": image_to_string(image, profile)}
+    timings["tesseract"] = time.perf_counter() - started
+    return page, timings
+
+
+def resolve_profile(name: Optional[str]) -> Profile:
+    """The named Tesseract profile, or the default; 400 for unknown names"""
+    if name is None:
+        return OCR_TESSERACT_PROFILE
+    profile = TESSERACT_PROFILES.get(name)
+    if profile is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"profile must be one of: {', '.join(TESSERACT_PROFILES)}",
+        )
+    return profile
+
+
+def tesseract_cache_key(
+    sha256: str, dpi: int, stages: Tuple[str, ...], profile: Profile, words: bool
+) -> str:
+    params = {
+        "preprocess": stages,
+        "dpi": dpi,
+        "profile": profile.cache_params(),
+        # tesserocr and the CLI segment and score words differently
+        "engine": engine_name(),
+    }
+    if words:
+        params["words"] = True
+    return cache_key(sha256, "tesseract", params)
+
+
+def select_words(
+    pages: List[Dict[str, Any]], min_confidence: Optional[float]
+) -> List[Dict[str, Any]]:
+    """Pages with words below ``min_confidence`` dropped from their word data"""
+    if not min_confidence:
+        return pages
+    return [
+        (
+            {**page, "words": filter_words(page["words"], min_confidence)}
+            if "words" in page
+            else page
+        )
+        for page in pages
+    ]
+
+
+async def check_page_count(upload: Upload) -> int:
+    """Count pages off the event loop and enforce OCR_MAX_PAGES"""
+    with stage("page_count"):
+        page_count = await asyncio.to_thread(count_pages, upload.source)
+    if page_count > OCR_MAX_PAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Document has {page_count} pages; limit is {OCR_MAX_PAGES}",
+        )
+    return page_count
+
+
+async def iter_ocr_pages(
+    upload: Upload,
+    page_count: int,
+    dpi: int,
+    stages: Tuple[str, ...],
+    profile: Profile,
+    limit: Optional[asyncio.Semaphore] = None,
+    words: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """OCR every page in parallel, yielding each page in order once it is ready
+
+    Workers receive the spool file path for large uploads, so a many-page
+    packet is not pickled once per page. Batches pass one ``limit`` for all
+    of their documents.
+    """
+    # One request never holds more slots than there are workers, so a large
+    # packet cannot starve other uploads of the queue
+    if limit is None:
+        limit = asyncio.Semaphore(ocr_executor.max_workers)
+
+    async def _page(index: int) -> Dict[str, Any]:
+        async with limit:
+            page, timings = await ocr_executor.run(
+                run_tesseract_page, upload.source, index, dpi, stages, profile, words
+            )
+        for name, seconds in timings.items():
+            observe_stage(name, seconds)
+        return page
+
+    tasks = [asyncio.ensure_future(_page(i)) for i in range(page_count)]
+    try:
+        for index, task in enumerate(tasks):
+            yield {"page_number": index + 1, **await task}
+    finally:
+        # Stop outstanding pages on failure or client disconnect
+        for task in tasks:
+            task.cancel()
+
+
+async def analyze_with_azure(model_id: str, upload: Upload, **kwargs):
+    """Run an Azure analysis under the shared concurrency limit and timeout
+
+    Submission and polling are separate azure_guard calls: a failed poll
+    resumes the operation from its continuation token rather than sending
+    (and paying for) the document again. One concurrency slot is held for the
+    whole analysis; AZURE_TIMEOUT_SECONDS covers waiting for it, both phases
+    and the backoff between attempts.
+    """
+    global azure_in_flight
+
+    async def _submit():
+        # Every attempt sends the document from the start; spooled uploads
+        # are streamed from disk rather than loaded
+        document = upload.open_document()
+        try:
+            return await form_recognizer_client.begin_analyze_document(
+                model_id, document=document, **kwargs
+            )
+        finally:
+            if hasattr(document, "close"):
+                document.close()
+
+    async def _analyze():
+        with stage("azure_wait"):
+            await azure_semaphore.acquire()
+        try:
+            with stage(f"azure_{model_id}"):
+                poller = await azure_guard.call_async(_submit)
+                token = poller.continuation_token()
+                polls = 0
+
+                async def _poll():
+                    nonlocal poller, polls
+                    if polls:
+                        # A poller that failed only re-raises its error
+                        poller = await form_recognizer_client.begin_analyze_document(
+                            None, None, continuation_token=token, **kwargs
+                        )
+                    polls += 1
+                    return await poller.result()
+
+                return await azure_guard.call_async(_poll)
+        finally:
+            azure_semaphore.release()
+
+    azure_in_flight += 1
+    try:
+        return await asyncio.wait_for(_analyze(), timeout=AZURE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # A hung analysis says as much about Azure's health as a 5xx
+        azure_guard.breaker.record_failure()
+        raise
+    finally:
+        azure_in_flight -= 1
+
+
+async def document_page_count(upload: Upload) -> int:
+    if detect_format(upload.head()) == "image":
+        return 1
+    with stage("page_count"):
+        return await asyncio.to_thread(count_pages, upload.source)
+
+
+def result_pages(result) -> List[Any]:
+    # Results requested with cls=raw_analyze_result are plain dicts
+    return result["pages"] if isinstance(result, dict) else result.pages
+
+
+async def replay(items: List[Any]) -> AsyncIterator[Any]:
+    """Feed an already collected list to helpers that take a live stream"""
+    for item in items:
+        yield item
+
+
+async def iter_azure_pages(
+    model_id: str, upload: Upload, page_count: Optional[int] = None, **kwargs
+) -> AsyncIterator[tuple]:
+    """Analyze a document in page chunks, yielding (page, result) in order
+
+    Chunks run concurrently under the shared Azure semaphore; Azure bills per
+    page, so splitting does not change cost but lets early pages stream out.
+    """
+    if page_count is None:
+        page_count = await document_page_count(upload)
+
+    if page_count <= AZURE_STREAM_CHUNK_PAGES:
+        ranges = [None]
+    else:
+        ranges = [
+            f"{first}-{min(first + AZURE_STREAM_CHUNK_PAGES - 1, page_count)}"
+            for first in range(1, page_count + 1, AZURE_STREAM_CHUNK_PAGES)
+        ]
+
+    tasks = [
+        asyncio.ensure_future(
+            analyze_with_azure(
+                model_id, upload, **kwargs, **({"pages": r} if r else {})
+            )
+        )
+        for r in ranges
+    ]
+    try:
+        for task in tasks:
+            result = await task
+            for page in result_pages(result):
+                yield page, result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_read_pages(
+    analyzed: AsyncIterator[tuple], detail: str
+) -> AsyncIterator[dict]:
+    """Page data for (page, result) pairs of raw prebuilt-read analyses"""
+    indexed = None
+    index: Dict[int, List[str]] = {}
+    async for page, result in analyzed:
+        if result is not indexed:
+            indexed = result
+            index = paragraphs_by_page(result)
+        yield read_page_data(page, index.get(page["pageNumber"], []), detail)
+
+
+def layout_page_data(page, tables: List[Any]) -> Dict[str, Any]:
+    """Lines and table grids for one page of a prebuilt-layout result"""
+    return {
+        "page_number": page.page_number,
+        "width": page.width,
+        "height": page.height,
+        "lines": [line.content for line in page.lines],
+        "tables": [table_grid(table) for table in tables],
+    }
+
+
+async def iter_layout_pages(analyzed: AsyncIterator[tuple]) -> AsyncIterator[dict]:
+    """Page data for (page, result) pairs of prebuilt-layout analyses
+
+    Pages of one analyze result share its table list, so the page -> tables
+    index is built once per result rather than scanned for every page.
+    """
+    indexed = None
+    index: Dict[int, List[Any]] = {}
+    async for page, result in analyzed:
+        if result is not indexed:
+            indexed = result
+            index = tables_by_page(getattr(result, "tables", None))
+        yield layout_page_data(page, index.get(page.page_number, []))
+
+
+def done_event(result: Dict[str, Any], page_count: int, cache: str) -> Dict[str, Any]:
+    """Summary sent after the last page of a streamed response"""
+    return {
+        "method": result["method"],
+        "page_count": page_count,
+        "sha256": result["sha256"],
+        "cache": cache,
+    }
+
+
+async def cached_page_events(
+    pages: List[Dict[str, Any]], result: Dict[str, Any]
+) -> AsyncIterator[tuple]:
+    """Replay a cached result as page events"""
+    for page in pages:
+        yield "page", page
+    yield "done", done_event(result, len(pages), "hit")
+
+
+# Called with (pages done, page count) as a document is processed
+Progress = Callable[[int, int], None]
+
+
+async def tesseract_document(
+    upload: Upload,
+    dpi: int,
+    stages: Tuple[str, ...],
+    profile: Profile,
+    limit: Optional[asyncio.Semaphore] = None,
+    progress: Optional[Progress] = None,
+    words: bool = False,
+) -> Tuple[Dict[str, Any], str]:
+    """OCR a whole document with Tesseract; returns (result, cache status)"""
+    key = tesseract_cache_key(upload.sha256, dpi, stages, profile, words)
+    cached = await ocr_cache.get(key)
+    if cached is not None:
+        if progress is not None:
+            progress(cached["page_count"], cached["page_count"])
+        return cached, "hit"
+
+    # Split pages, then preprocess and extract text in the worker pool
+    page_count = await check_page_count(upload)
+    pages = []
+    async for page in iter_ocr_pages(
+        upload, page_count, dpi, stages, profile, limit, words
+    ):
+        pages.append(page)
+        if progress is not None:
+            progress(len(pages), page_count)
+    result = tesseract_result(pages, upload.sha256, profile)
+    await ocr_cache.set(key, result)
+    return result, "miss"
+
+
+async def azure_document_pages(
+    model_id: str, upload: Upload, progress: Optional[Progress] = None, **kwargs
+) -> List[tuple]:
+    """All (page, result) pairs of an analysis
+
+    Without ``progress`` the document is sent in one request. With it, pages
+    are analyzed in chunks so progress can be reported as chunks finish.
+    """
+    if progress is None:
+        result = await analyze_with_azure(model_id, upload, **kwargs)
+        return [(page, result) for page in result_pages(result)]
+    page_count = await document_page_count(upload)
+    progress(0, page_count)
+    pages = []
+    async for page, result in iter_azure_pages(model_id, upload, page_count, **kwargs):
+        pages.append((page, result))
+        progress(len(pages), page_count)
+    return pages
+
+
+def read_cache_key(sha256: str, detail: str) -> str:
+    return cache_key(sha256, "prebuilt-read", {"detail": detail})
+
+
+def read_response(
+    page_data: List[Dict[str, Any]], sha256: str, detail: str
+) -> Dict[str, Any]:
+    response = {
+        "text": "".join(page_text(page) for page in page_data),
+        "method": "azure_form_recognizer",
+        "pages": len(page_data),
+        "sha256": sha256,
+    }
+    if detail != "text":
+        response["page_data"] = page_data
+    return response
+
 
+async def read_document(
+    upload: Upload, progress: Optional[Progress] = None, detail: str = "text"
+) -> Tuple[Dict[str, Any], str]:
+    """Azure prebuilt-read text for a whole document; returns (result, cache status)
 
-def preprocess_image(image_bytes: bytes) -> Image.Image:
-    """Preprocess image for better OCR results"""
-    # Convert bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    ``detail`` adds per-page lines, paragraphs and words (see ocr_read).
+    """
+    key = read_cache_key(upload.sha256, detail)
+    cached = await ocr_cache.get(key)
+    if cached is not None:
+        page_data = cached.pop("page_data")
+        if progress is not None:
+            progress(len(page_data), len(page_data))
+        return read_response(page_data, upload.sha256, detail), "hit"
 
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Analyze document; the raw JSON result skips the SDK's object model
+    analyzed = await azure_document_pages(
+        "prebuilt-read", upload, progress, cls=raw_analyze_result
+    )
+    page_data = [page async for page in iter_read_pages(replay(analyzed), detail)]
 
-    # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    response = read_response(page_data, upload.sha256, detail)
+    # Per-page data is kept in the cache entry so streamed and buffered
+    # responses can share it
+    await ocr_cache.set(key, {**response, "page_data": page_data})
+    return response, "miss"
 
-    # Apply threshold to get binary image
-    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-    # Convert back to PIL Image
-    pil_image = Image.fromarray(thresh)
+# Cached layout results hold table grids; the parameter keeps entries in the
+# earlier per-cell format from being served
+LAYOUT_CACHE_PARAMS = {"tables": "grid"}
 
-    return pil_image
+
+async def layout_document(
+    upload: Upload, progress: Optional[Progress] = None
+) -> Tuple[Dict[str, Any], str]:
+    """Azure prebuilt-layout lines and tables; returns (result, cache status)"""
+    key = cache_key(upload.sha256, "prebuilt-layout", LAYOUT_CACHE_PARAMS)
+    cached = await ocr_cache.get(key)
+    if cached is not None:
+        if progress is not None:
+            progress(len(cached["pages"]), len(cached["pages"]))
+        return cached, "hit"
+
+    # Analyze document with layout model
+    pages = await azure_document_pages("prebuilt-layout", upload, progress)
+
+    # Extract structured data
+    pages_data = [page async for page in iter_layout_pages(replay(pages))]
+
+    response = {
+        "method": "azure_medical_form",
+        "pages": pages_data,
+        "sha256": upload.sha256,
+    }
+    await ocr_cache.set(key, response)
+    return response, "miss"
+
+
+async def with_breaker_fallback(
+    analysis: Awaitable[Tuple[Dict[str, Any], str]],
+    upload: Upload,
+    dpi: int = OCR_PDF_DPI,
+    stages: Tuple[str, ...] = OCR_PREPROCESS_STAGES,
+    profile: Profile = OCR_TESSERACT_PROFILE,
+    limit: Optional[asyncio.Semaphore] = None,
+    progress: Optional[Progress] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """Await an Azure document analysis, or use Tesseract while the circuit is open
+
+    Falls back only with AZURE_BREAKER_FALLBACK=tesseract; the result is
+    marked with ``"fallback": "tesseract"``.
+    """
+    try:
+        return await analysis
+    except CircuitOpen:
+        if AZURE_BREAKER_FALLBACK != "tesseract":
+            raise
+    result, cache = await tesseract_document(
+        upload, dpi, stages, profile, limit, progress
+    )
+    return {**result, "fallback": "tesseract"}, cache
+
+
+def azure_unavailable(e: Exception) -> Optional[HTTPException]:
+    """503 for an open circuit, 429 when Azure still throttled after retries"""
+    if isinstance(e, CircuitOpen):
+        return HTTPException(
+            status_code=503,
+            detail="Azure is unavailable, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if status_code(e) == 429:
+        retry_after = math.ceil(retry_after_seconds(e) or 1)
+        return HTTPException(
+            status_code=429,
+            detail="Azure is throttling requests, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    return None
 
 
 @app.get("/health")
@@ -69,126 +865,781 @@ async def health_check():
     return {"status": "healthy", "service": "ocr"}
 
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness: 503 until the OCR pool has been warmed up, or while it is broken"""
+    broken = ocr_executor.broken
+    ready = warmup_state["status"] in ("ready", "skipped") and not broken
+    body = {
+        "ready": ready,
+        "pid": os.getpid(),
+        "warmup": dict(warmup_state),
+        "executor_workers": ocr_executor.max_workers,
+        "executor_broken": broken,
+        "azure_configured": form_recognizer_client is not None,
+    }
+    if broken:
+        # A pool whose idle worker died is only noticed here; rebuilt now so
+        # the worker does not stay unready once traffic is routed away
+        ocr_executor.restart()
+    if not ready:
+        response.status_code = 503
+    return body
+
+
+@app.get("/ocr/stats")
+async def ocr_stats():
+    """Worker pool utilisation for capacity planning"""
+    return {
+        "executor": ocr_executor.stats(),
+        "azure": {
+            "configured": form_recognizer_client is not None,
+            "max_concurrency": AZURE_MAX_CONCURRENCY,
+            "in_flight": azure_in_flight,
+            "timeout_seconds": AZURE_TIMEOUT_SECONDS,
+            "breaker_fallback": AZURE_BREAKER_FALLBACK,
+            **azure_guard.stats(),
+        },
+        "cache": ocr_cache.stats(),
+        "jobs": job_scheduler.stats(),
+        "tesseract": {
+            "engine": engine_name(),
+            "default_profile": OCR_TESSERACT_PROFILE.name,
+            "profiles": {
+                name: profile.cache_params()
+                for name, profile in TESSERACT_PROFILES.items()
+            },
+        },
+    }
+
+
+def collect_metrics():
+    """Copy executor, Azure, cache and job counters into their metrics"""
+    executor = ocr_executor.stats()
+    ocr_metrics.EXECUTOR_WORKERS.set(executor["workers"])
+    ocr_metrics.EXECUTOR_RUNNING.set(executor["running"])
+    ocr_metrics.EXECUTOR_QUEUED.set(executor["queued"])
+    for outcome in ("completed", "failed", "timed_out", "rejected"):
+        ocr_metrics.EXECUTOR_JOBS.set(executor[outcome], outcome=outcome)
+    ocr_metrics.EXECUTOR_RESTARTS.set(executor["restarts"])
+    ocr_metrics.AZURE_IN_FLIGHT.set(azure_in_flight)
+    guard = azure_guard.stats()
+    ocr_metrics.AZURE_CIRCUIT_OPEN.set(1 if guard["circuit"] == "open" else 0)
+    for event in ("calls", "retries", "failures", "throttled", "circuit_rejected"):
+        ocr_metrics.AZURE_CALLS.set(guard[event], event=event)
+    ocr_metrics.AZURE_RATE_LIMIT_WAIT.set(guard["rate_limit_wait_seconds"])
+    cache = ocr_cache.stats()
+    ocr_metrics.CACHE_LOOKUPS.set(cache["hits"], result="hit")
+    ocr_metrics.CACHE_LOOKUPS.set(cache["misses"], result="miss")
+    ocr_metrics.CACHE_HIT_RATIO.set(cache["hit_ratio"])
+    ocr_metrics.CACHE_MEMORY_BYTES.set(cache["memory_bytes"])
+    jobs = job_scheduler.stats()
+    ocr_metrics.JOBS_QUEUED.set(jobs["queued"])
+    ocr_metrics.JOBS_RUNNING.set(jobs["running"])
+    ocr_metrics.JOBS_FINISHED.set(jobs["completed"], outcome="succeeded")
+    ocr_metrics.JOBS_FINISHED.set(jobs["failed"], outcome="failed")
+
+
+ocr_metrics.REGISTRY.add_collector(collect_metrics)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics, summed over every server worker"""
+    return Response(ocr_metrics.REGISTRY.render(), media_type=ocr_metrics.CONTENT_TYPE)
+
+
+@app.delete("/ocr/cache")
+async def invalidate_cache(sha256: Optional[str] = None, method: Optional[str] = None):
+    """Invalidate cached results for a file hash (optionally one method), or all"""
+    if method and not sha256:
+        raise HTTPException(status_code=400, detail="method requires sha256")
+    removed = await ocr_cache.invalidate(sha256=sha256, method=method)
+    return {"removed": removed, "sha256": sha256, "method": method}
+
+
+def tesseract_result(
+    pages: List[Dict[str, Any]], sha256: str, profile: Profile
+) -> Dict[str, Any]:
+    return {
+        "text": "\n".join(page["text"] for page in pages),
+        "method": "tesseract",
+        "profile": profile.name,
+        "page_count": len(pages),
+        "pages": pages,
+        "sha256": sha256,
+    }
+
+
 @app.post("/ocr/tesseract")
-async def ocr_tesseract(file: UploadFile = File(...)):
-    """Extract text using Tesseract OCR"""
+async def ocr_tesseract(
+    file: UploadFile = File(...),
+    dpi: Optional[int] = Query(None, ge=72),
+    preprocess: Optional[str] = None,
+    profile: Optional[str] = None,
+    words: bool = False,
+    min_confidence: Optional[float] = None,
+    stream: Optional[str] = None,
+):
+    """Extract text using Tesseract OCR (images, multi-page PDF and TIFF)
+
+    ``words`` adds word boxes and confidences per page as parallel arrays;
+    ``min_confidence`` (0-100, implies ``words``) drops less certain words.
+    """
+    dpi = min(dpi or OCR_PDF_DPI, OCR_MAX_DPI)
+    tesseract_profile = resolve_profile(profile)
+    words = words or min_confidence is not None
     try:
-        # Read file
-        contents = await file.read()
+        stages = parse_stages(preprocess) if preprocess else OCR_PREPROCESS_STAGES
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stream:
+        validate_stream_format(stream)
+    upload = None
+    streaming = False
+    try:
+        # Read file (size-capped; large files are spooled to disk)
+        upload = await receive_upload(file)
+
+        if not stream:
+            result, cache = await tesseract_document(
+                upload, dpi, stages, tesseract_profile, words=words
+            )
+            result["pages"] = select_words(result["pages"], min_confidence)
+            return {**result, "filename": file.filename, "cache": cache}
 
-        # Preprocess image
-        processed_image = preprocess_image(contents)
+        # Serve repeat uploads from the cache
+        sha256 = upload.sha256
+        key = tesseract_cache_key(sha256, dpi, stages, tesseract_profile, words)
+        cached = await ocr_cache.get(key)
+        if cached is not None:
+            pages = select_words(cached["pages"], min_confidence)
+            return stream_events(cached_page_events(pages, cached), stream)
 
-        # Extract text
-        text = pytesseract.image_to_string(processed_image)
+        page_count = await check_page_count(upload)
 
-        return {"text": text, "method": "tesseract", "filename": file.filename}
+        async def events():
+            pages = []
+            async for page in iter_ocr_pages(
+                upload, page_count, dpi, stages, tesseract_profile, words=words
+            ):
+                pages.append(page)
+                yield "page", select_words([page], min_confidence)[0]
+            result = tesseract_result(pages, sha256, tesseract_profile)
+            await ocr_cache.set(key, result)
+            yield "done", done_event(result, len(pages), "miss")
 
+        # The response owns the upload from here and removes it when done
+        streaming = True
+        return stream_events(events(), stream, on_close=upload.close)
+
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=429,
+            detail="OCR queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ExecutorUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail="OCR workers are restarting, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except UnreadableDocument as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error(f"Tesseract OCR timed out for {file.filename}")
+        raise HTTPException(status_code=504, detail="OCR processing timed out")
     except Exception as e:
         logger.error(f"Tesseract OCR error: {e}")
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
+    finally:
+        if upload is not None and not streaming:
+            upload.close()
+
+
+def read_page_event(page_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "page_number": page_data["page_number"],
+        "text": page_text(page_data),
+        **page_data,
+    }
 
 
 @app.post("/ocr/azure")
-async def ocr_azure(file: UploadFile = File(...)):
-    """Extract text using Azure Form Recognizer"""
+async def ocr_azure(
+    file: UploadFile = File(...), detail: str = "text", stream: Optional[str] = None
+):
+    """Extract text using Azure Form Recognizer
+
+    ``detail=lines`` adds per-page lines, polygons and paragraphs in reading
+    order as ``page_data``; ``detail=words`` also adds word confidences.
+    """
     if not form_recognizer_client:
         raise HTTPException(
             status_code=503, detail="Azure Form Recognizer not configured"
         )
+    if detail not in READ_DETAILS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"detail must be one of: {', '.join(READ_DETAILS)}",
+        )
+    if stream:
+        validate_stream_format(stream)
 
+    upload = None
+    streaming = False
     try:
-        # Read file
-        contents = await file.read()
+        # Read file (size-capped; large files are spooled to disk)
+        upload = await receive_upload(file)
 
-        # Analyze document
-        poller = form_recognizer_client.begin_analyze_document(
-            "prebuilt-read", document=contents
-        )
-        result = poller.result()
+        if not stream:
+            response, cache = await with_breaker_fallback(
+                read_document(upload, detail=detail), upload
+            )
+            return {**response, "filename": file.filename, "cache": cache}
 
-        # Extract text
-        extracted_text = ""
-        for page in result.pages:
-            for line in page.lines:
-                extracted_text += line.content + "\n"
+        # Serve repeat uploads from the cache
+        sha256 = upload.sha256
+        key = read_cache_key(sha256, detail)
+        cached = await ocr_cache.get(key)
+        if cached is not None:
+            pages = [read_page_event(page) for page in cached.pop("page_data")]
+            return stream_events(cached_page_events(pages, cached), stream)
+        azure_guard.breaker.check()
 
-        return {
-            "text": extracted_text,
-            "method": "azure_form_recognizer",
-            "filename": file.filename,
-            "pages": len(result.pages),
-        }
+        async def events():
+            page_data = []
+            analyzed = iter_azure_pages("prebuilt-read", upload, cls=raw_analyze_result)
+            async for page in iter_read_pages(analyzed, detail):
+                page_data.append(page)
+                yield "page", read_page_event(page)
+            response = read_response(page_data, sha256, detail)
+            await ocr_cache.set(key, {**response, "page_data": page_data})
+            yield "done", done_event(response, len(page_data), "miss")
+
+        # The response owns the upload from here and removes it when done
+        streaming = True
+        return stream_events(events(), stream, on_close=upload.close)
 
+    except HTTPException:
+        raise
+    except UnreadableDocument as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error(f"Azure OCR timed out for {file.filename}")
+        raise HTTPException(status_code=504, detail="Azure OCR timed out")
     except Exception as e:
         logger.error(f"Azure OCR error: {e}")
+        unavailable = azure_unavailable(e)
+        if unavailable is not None:
+            raise unavailable
         raise HTTPException(
             status_code=500, detail=f"Azure OCR processing failed: {str(e)}"
         )
+    finally:
+        if upload is not None and not streaming:
+            upload.close()
 
 
 @app.post("/ocr/medical-form")
-async def ocr_medical_form(file: UploadFile = File(...)):
-    """Extract structured data from medical forms using Azure"""
+async def ocr_medical_form(
+    file: UploadFile = File(...), tables: str = "grid", stream: Optional[str] = None
+):
+    """Extract structured data from medical forms using Azure
+
+    ``tables=csv`` returns each table as a CSV string instead of a grid.
+    """
     if not form_recognizer_client:
         raise HTTPException(
             status_code=503, detail="Azure Form Recognizer not configured"
         )
+    if tables not in TABLE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"tables must be one of: {', '.join(TABLE_FORMATS)}",
+        )
+    if stream:
+        validate_stream_format(stream)
 
+    upload = None
+    streaming = False
     try:
-        # Read file
-        contents = await file.read()
+        # Read file (size-capped; large files are spooled to disk)
+        upload = await receive_upload(file)
 
-        # Analyze document with layout model
-        poller = form_recognizer_client.begin_analyze_document(
-            "prebuilt-layout", document=contents
-        )
-        result = poller.result()
+        if not stream:
+            response, cache = await with_breaker_fallback(
+                layout_document(upload), upload
+            )
+            if "fallback" not in response:
+                response["pages"] = format_tables(response["pages"], tables)
+            return {**response, "filename": file.filename, "cache": cache}
 
-        # Extract structured data
-        pages_data = []
-        for page in result.pages:
-            page_data = {
-                "page_number": page.page_number,
-                "width": page.width,
-                "height": page.height,
-                "lines": [line.content for line in page.lines],
-                "tables": [],
-            }
+        # Serve repeat uploads from the cache
+        sha256 = upload.sha256
+        key = cache_key(sha256, "prebuilt-layout", LAYOUT_CACHE_PARAMS)
+        cached = await ocr_cache.get(key)
+        if cached is not None:
+            pages = format_tables(cached["pages"], tables)
+            return stream_events(cached_page_events(pages, cached), stream)
+        azure_guard.breaker.check()
 
-            # Extract tables if present
-            if hasattr(result, "tables"):
-                for table in result.tables:
-                    if table.bounding_regions and any(
-                        region.page_number == page.page_number
-                        for region in table.bounding_regions
-                    ):
-                        table_data = []
-                        for cell in table.cells:
-                            table_data.append(
-                                {
-                                    "row_index": cell.row_index,
-                                    "column_index": cell.column_index,
-                                    "content": cell.content,
-                                    "is_header": cell.kind == "columnHeader",
-                                }
-                            )
-                        page_data["tables"].append(table_data)
-
-            pages_data.append(page_data)
+        async def events():
+            pages_data = []
+            analyzed = iter_azure_pages("prebuilt-layout", upload)
+            async for page_data in iter_layout_pages(analyzed):
+                pages_data.append(page_data)
+                yield "page", format_tables([page_data], tables)[0]
+            response = {
+                "method": "azure_medical_form",
+                "pages": pages_data,
+                "sha256": sha256,
+            }
+            await ocr_cache.set(key, response)
+            yield "done", done_event(response, len(pages_data), "miss")
 
-        return {
-            "method": "azure_medical_form",
-            "filename": file.filename,
-            "pages": pages_data,
-        }
+        # The response owns the upload from here and removes it when done
+        streaming = True
+        return stream_events(events(), stream, on_close=upload.close)
 
+    except HTTPException:
+        raise
+    except UnreadableDocument as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error(f"Medical form OCR timed out for {file.filename}")
+        raise HTTPException(status_code=504, detail="Medical form processing timed out")
     except Exception as e:
         logger.error(f"Medical form OCR error: {e}")
+        unavailable = azure_unavailable(e)
+        if unavailable is not None:
+            raise unavailable
         raise HTTPException(
             status_code=500, detail=f"Medical form processing failed: {str(e)}"
         )
+    finally:
+        if upload is not None and not streaming:
+            upload.close()
 
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+# Azure engine /ocr/auto escalates to, by ?fallback=
+AUTO_FALLBACKS = {"read": "azure", "layout": "medical-form"}
+
+
+def tesseract_quality(pages: List[Dict[str, Any]]) -> Tuple[float, float]:
+    """Mean word confidence and alphanumeric characters per megapixel
+
+    Pages must carry word data. A document without any words scores 0 on both.
+    """
+    confidences = [conf for page in pages for conf in page["words"]["confidence"]]
+    characters = sum(sum(ch.isalnum() for ch in page["text"]) for page in pages)
+    megapixels = sum(page["width"] * page["height"] for page in pages) / 1e6
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    density = characters / megapixels if megapixels else 0.0
+    return confidence, density
+
+
+@app.post("/ocr/auto")
+async def ocr_auto(
+    file: UploadFile = File(...),
+    fallback: str = "read",
+    dpi: Optional[int] = Query(None, ge=72),
+    preprocess: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """Tesseract first; Azure only when Tesseract's result looks unreliable
+
+    The document goes to ``prebuilt-read`` (``fallback=read``) or
+    ``prebuilt-layout`` (``fallback=layout``) when its mean word confidence
+    or text density is below OCR_AUTO_MIN_CONFIDENCE / OCR_AUTO_MIN_DENSITY.
+    """
+    if fallback not in AUTO_FALLBACKS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"fallback must be one of: {', '.join(AUTO_FALLBACKS)}",
+        )
+    dpi = min(dpi or OCR_PDF_DPI, OCR_MAX_DPI)
+    tesseract_profile = resolve_profile(profile)
+    try:
+        stages = parse_stages(preprocess) if preprocess else OCR_PREPROCESS_STAGES
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload = None
+    try:
+        # Read file (size-capped; large files are spooled to disk)
+        upload = await receive_upload(file)
+        result, cache = await tesseract_document(
+            upload, dpi, stages, tesseract_profile, words=True
+        )
+        confidence, density = tesseract_quality(result["pages"])
+        ocr_metrics.AUTO_CONFIDENCE.observe(confidence)
+        ocr_metrics.AUTO_DENSITY.observe(density)
+        routing = {
+            "engine": "tesseract",
+            "reason": "confident",
+            "mean_confidence": round(confidence, 1),
+            "density": round(density, 1),
+        }
+        if confidence < OCR_AUTO_MIN_CONFIDENCE:
+            routing["reason"] = "low_confidence"
+        elif density < OCR_AUTO_MIN_DENSITY:
+            routing["reason"] = "low_density"
+
+        if routing["reason"] != "confident":
+            engine = AUTO_FALLBACKS[fallback]
+            if not form_recognizer_client:
+                routing["reason"] = "azure_unavailable"
+            else:
+                try:
+                    result, cache = await ocr_document(
+                        engine, upload, dpi, stages, tesseract_profile, fallback=False
+                    )
+                    routing["engine"] = engine
+                except CircuitOpen:
+                    # Azure is known to be down; no call was made
+                    routing["reason"] = "circuit_open"
+                except Exception as e:
+                    # The Tesseract text is still better than no answer
+                    logger.error(f"Auto OCR escalation failed for {file.filename}: {e}")
+                    routing["reason"] = "azure_error"
+                    routing["error"] = error_detail(e)
+
+        ocr_metrics.AUTO_ROUTES.inc(engine=routing["engine"], reason=routing["reason"])
+        if routing["engine"] == "tesseract":
+            # Word data was only needed for scoring
+            pages = [
+                {"page_number": page["page_number"], "text": page["text"]}
+                for page in result["pages"]
+            ]
+            result = {**result, "pages": pages}
+        return {**result, "filename": file.filename, "cache": cache, "routing": routing}
+
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=429,
+            detail="OCR queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ExecutorUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail="OCR workers are restarting, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except UnreadableDocument as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error(f"Auto OCR timed out for {file.filename}")
+        raise HTTPException(status_code=504, detail="OCR processing timed out")
+    except Exception as e:
+        logger.error(f"Auto OCR error: {e}")
+        raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+ENGINES = ("tesseract", "azure", "medical-form")
+
+
+def check_engine(engine: str):
+    if engine not in ENGINES:
+        raise HTTPException(
+            status_code=400, detail=f"engine must be one of: {', '.join(ENGINES)}"
+        )
+    if engine != "tesseract" and not form_recognizer_client:
+        raise HTTPException(
+            status_code=503, detail="Azure Form Recognizer not configured"
+        )
+
+
+async def ocr_document(
+    engine: str,
+    upload: Upload,
+    dpi: int,
+    stages: Tuple[str, ...],
+    profile: Profile,
+    limit: Optional[asyncio.Semaphore] = None,
+    progress: Optional[Progress] = None,
+    fallback: bool = True,
+) -> Tuple[Dict[str, Any], str]:
+    """Whole-document OCR with the named engine; returns (result, cache status)
+
+    With ``fallback`` an open Azure circuit may be answered by Tesseract
+    (AZURE_BREAKER_FALLBACK).
+    """
+    if engine == "tesseract":
+        return await tesseract_document(upload, dpi, stages, profile, limit, progress)
+    if engine == "azure":
+        analysis = read_document(upload, progress)
+    else:
+        analysis = layout_document(upload, progress)
+    if not fallback:
+        return await analysis
+    return await with_breaker_fallback(
+        analysis, upload, dpi, stages, profile, limit, progress
+    )
+
+
+def error_detail(e: Exception) -> Dict[str, Any]:
+    """Error entry for a batch file or job, with the status the endpoint would use"""
+    if isinstance(e, HTTPException):
+        return {"status": e.status_code, "detail": e.detail}
+    if isinstance(e, ExecutorSaturated):
+        return {
+            "status": 429,
+            "detail": "OCR queue is full, retry later",
+            "retry_after": e.retry_after,
+        }
+    if isinstance(e, ExecutorUnavailable):
+        return {
+            "status": 503,
+            "detail": "OCR workers are restarting, retry later",
+            "retry_after": e.retry_after,
+        }
+    if isinstance(e, UnreadableDocument):
+        return {"status": e.status_code, "detail": str(e)}
+    if isinstance(e, asyncio.TimeoutError):
+        return {"status": 504, "detail": "OCR processing timed out"}
+    unavailable = azure_unavailable(e)
+    if unavailable is not None:
+        return {
+            "status": unavailable.status_code,
+            "detail": unavailable.detail,
+            "retry_after": int(unavailable.headers["Retry-After"]),
+        }
+    return {"status": 500, "detail": f"OCR processing failed: {str(e)}"}
+
+
+def unique_name(name: Optional[str], seen: Dict[str, int]) -> str:
+    """Result key for a file; repeated names get a #2, #3... suffix"""
+    name = name or "upload"
+    seen[name] = seen.get(name, 0) + 1
+    return name if seen[name] == 1 else f"{name}#{seen[name]}"
+
+
+@app.post("/ocr/batch")
+async def ocr_batch(
+    files: List[UploadFile] = File(...),
+    engine: str = "tesseract",
+    dpi: Optional[int] = Query(None, ge=72),
+    preprocess: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """OCR many files, or zip archives of them, in one request
+
+    Results are keyed by filename (zip members as ``archive.zip/member``) and
+    each file succeeds or fails on its own.
+    """
+    check_engine(engine)
+    dpi = min(dpi or OCR_PDF_DPI, OCR_MAX_DPI)
+    tesseract_profile = resolve_profile(profile)
+    try:
+        stages = parse_stages(preprocess) if preprocess else OCR_PREPROCESS_STAGES
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(files) > OCR_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(files)} files; limit is {OCR_BATCH_MAX_FILES}",
+        )
+
+    # (name, Upload or the error that stopped it from being read)
+    items: List[Tuple[str, Any]] = []
+    seen: Dict[str, int] = {}
+    # Identical files in one batch (re-sent scans, duplicated zip members)
+    # are processed once and share the result
+    shared: Dict[str, asyncio.Future] = {}
+    # Archives expand on disk, so what they unpack to counts against
+    # OCR_BATCH_MAX_BYTES along with the files sent as they are
+    unpacked = 0
+    try:
+        for file in files:
+            try:
+                upload = await receive_upload(file)
+            except HTTPException as e:
+                items.append((unique_name(file.filename, seen), e))
+                continue
+            if not is_zip(upload):
+                unpacked += upload.size
+                items.append((unique_name(file.filename, seen), upload))
+                continue
+            try:
+                members = await asyncio.to_thread(
+                    extract_zip,
+                    upload,
+                    OCR_BATCH_MAX_FILES,
+                    OCR_MAX_UPLOAD_BYTES,
+                    OCR_UPLOAD_SPOOL_BYTES,
+                    OCR_UPLOAD_DIR,
+                    OCR_BATCH_MAX_BYTES - unpacked,
+                )
+            except HTTPException as e:
+                items.append((unique_name(file.filename, seen), e))
+                continue
+            finally:
+                upload.close()
+            unpacked += sum(m.size for _, m in members if isinstance(m, Upload))
+            items.extend((unique_name(name, seen), member) for name, member in members)
+
+        if len(items) > OCR_BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch has {len(items)} files; limit is {OCR_BATCH_MAX_FILES}",
+            )
+
+        # Azure documents wait here rather than inside analyze_with_azure, so
+        # AZURE_TIMEOUT_SECONDS is not spent queueing behind the rest of the
+        # batch. Tesseract pages of every document share one pool-sized limit.
+        if engine == "tesseract":
+            documents = asyncio.Semaphore(ocr_executor.max_workers)
+        else:
+            documents = asyncio.Semaphore(AZURE_MAX_CONCURRENCY)
+        pages = asyncio.Semaphore(ocr_executor.max_workers)
+
+        async def process(upload: Upload) -> Tuple[Dict[str, Any], str]:
+            async with documents:
+                return await ocr_document(
+                    engine, upload, dpi, stages, tesseract_profile, limit=pages
+                )
+
+        async def run(name: str, item: Any) -> Dict[str, Any]:
+            if isinstance(item, Exception):
+                return {"filename": name, "error": error_detail(item)}
+            try:
+                duplicate = item.sha256 in shared
+                if not duplicate:
+                    shared[item.sha256] = asyncio.ensure_future(process(item))
+                result, cache = await asyncio.shield(shared[item.sha256])
+                return {
+                    **result,
+                    "filename": name,
+                    "cache": "hit" if duplicate else cache,
+                }
+            except Exception as e:
+                logger.error(f"Batch OCR error for {name}: {e}")
+                return {"filename": name, "error": error_detail(e)}
+            finally:
+                item.close()
+
+        results = await asyncio.gather(*(run(name, item) for name, item in items))
+    finally:
+        for task in shared.values():
+            task.cancel()
+        for _, item in items:
+            if isinstance(item, Upload):
+                item.close()
+
+    failed = sum(1 for result in results if "error" in result)
+    return {
+        "engine": engine,
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": {result["filename"]: result for result in results},
+    }
+
+
+# Jobs that find the worker pool full wait for Retry-After and try again
+JOB_SATURATED_RETRIES = 3
+
+
+async def run_job(
+    job: Job, upload: Upload, dpi: int, stages: Tuple[str, ...], profile: Profile
+) -> Dict[str, Any]:
+    for attempt in range(JOB_SATURATED_RETRIES + 1):
+        try:
+            result, cache = await ocr_document(
+                job.engine, upload, dpi, stages, profile, progress=job.progress
+            )
+            return {**result, "filename": job.filename, "cache": cache}
+        except (ExecutorSaturated, ExecutorUnavailable) as e:
+            if attempt == JOB_SATURATED_RETRIES:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+@app.post("/ocr/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    engine: str = "tesseract",
+    priority: Optional[str] = None,
+    dpi: Optional[int] = Query(None, ge=72),
+    preprocess: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """Queue a document for background OCR and return its job ID
+
+    Single-page documents default to ``interactive`` priority and multi-page
+    ones to ``bulk``, so quick lookups are not stuck behind backfills.
+    """
+    check_engine(engine)
+    if priority is not None and priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"priority must be one of: {', '.join(PRIORITIES)}",
+        )
+    dpi = min(dpi or OCR_PDF_DPI, OCR_MAX_DPI)
+    tesseract_profile = resolve_profile(profile)
+    try:
+        stages = parse_stages(preprocess) if preprocess else OCR_PREPROCESS_STAGES
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Read file (size-capped; large files are spooled to disk)
+    upload = await receive_upload(file)
+    try:
+        page_count = await check_page_count(upload)
+        job = Job(
+            engine=engine,
+            priority=priority or ("interactive" if page_count == 1 else "bulk"),
+            filename=file.filename,
+            sha256=upload.sha256,
+            page_count=page_count,
+            ttl_seconds=job_scheduler.store.ttl_seconds,
+        )
+        # The job owns the upload from here and removes it when done
+        await job_scheduler.submit(
+            job,
+            lambda job: run_job(job, upload, dpi, stages, tesseract_profile),
+            cleanup=upload.close,
+        )
+    except JobQueueFull:
+        upload.close()
+        raise HTTPException(
+            status_code=429,
+            detail="OCR job queue is full, retry later",
+            headers={"Retry-After": "30"},
+        )
+    except HTTPException:
+        upload.close()
+        raise
+    except UnreadableDocument as e:
+        upload.close()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        upload.close()
+        logger.error(f"Job submission failed for {file.filename}: {e}")
+        raise HTTPException(status_code=400, detail=f"Unreadable document: {str(e)}")
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "priority": job.priority,
+        "status_url": f"/ocr/jobs/{job.id}",
+    }
+
+
+@app.get("/ocr/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and (once finished) the result of an OCR job"""
+    job = await job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
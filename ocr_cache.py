@@ -0,0 +1,249 @@
+"""
+Content-addressed OCR result cache
+Keys are SHA-256 of the uploaded bytes plus engine/model and preprocessing
+parameters. A byte-budgeted in-memory LRU sits in front of an optional SQLite
+tier with TTL eviction.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def cache_key(sha256: str, method: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Build a key from the file hash, engine/model and preprocessing parameters"""
+    params_json = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+    params_digest = hashlib.sha256(params_json.encode("utf-8")).hexdigest()[:16]
+    return f"{sha256}:{method}:{params_digest}"
+
+
+class MemoryLRU:
+    """LRU of serialized results bounded by total payload bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: bytes, expires_at: float):
+        # Entries larger than the whole budget are not worth evicting everything for
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, expires_at)
+            self.current_bytes += len(payload)
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, prefix: str = "") -> List[str]:
+        """Drop the entries whose key starts with ``prefix``; returns their keys"""
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return keys
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        payload, _ = self._entries.pop(key)
+        self.current_bytes -= len(payload)
+
+
+class SQLiteTier:
+    """On-disk tier; one row per key with an absolute expiry time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY,"
+            " sha256 TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ocr_cache_sha256 ON ocr_cache (sha256)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM ocr_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0], row[1]
+
+    def set(self, key: str, payload: bytes, expires_at: float):
+        sha256 = key.split(":", 1)[0]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, sha256, payload, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, sha256, payload, expires_at),
+            )
+            self._conn.commit()
+
+    def invalidate(
+        self, sha256: Optional[str] = None, method: Optional[str] = None
+    ) -> List[str]:
+        """Drop entries for a file hash (optionally one method); returns their keys"""
+        if sha256 is None:
+            where, args = "", ()
+        elif method is None:
+            where, args = " WHERE sha256 = ?", (sha256,)
+        else:
+            where, args = " WHERE key LIKE ?", (f"{sha256}:{method}:%",)
+        with self._lock:
+            keys = [
+                row[0]
+                for row in self._conn.execute("SELECT key FROM ocr_cache" + where, args)
+            ]
+            self._conn.execute("DELETE FROM ocr_cache" + where, args)
+            self._conn.commit()
+            return keys
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM ocr_cache WHERE expires_at < ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OCRCache:
+    """Two-tier cache of JSON-serializable OCR results"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        db_path: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryLRU(max_bytes) if max_bytes > 0 else None
+        self.disk: Optional[SQLiteTier] = None
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "OCRCache":
+        return cls(
+            max_bytes=int(os.getenv("OCR_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("OCR_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            db_path=os.getenv("OCR_CACHE_DB") or None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory is not None or self.disk is not None
+
+    def open(self):
+        if self.db_path and self.disk is None:
+            self.disk = SQLiteTier(self.db_path)
+            self.disk.purge_expired()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        payload = self.memory.get(key) if self.memory is not None else None
+        if payload is None and self.disk is not None:
+            row = await asyncio.to_thread(self.disk.get, key)
+            if row is not None:
+                payload, expires_at = row
+                # Promote to the memory tier for the next hit
+                if self.memory is not None:
+                    self.memory.set(key, payload, expires_at)
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(payload)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        expires_at = time.time() + self.ttl_seconds
+        if self.memory is not None:
+            self.memory.set(key, payload, expires_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, payload, expires_at)
+
+    async def invalidate(
+        self, sha256: Optional[str] = None, method: Optional[str] = None
+    ) -> int:
+        """
+        Drop entries for a file hash (optionally one method), or everything.
+        Returns the number of distinct keys removed.
+        """
+        if sha256 is None:
+            prefix = ""
+        elif method is None:
+            prefix = f"{sha256}:"
+        else:
+            prefix = f"{sha256}:{method}:"
+        # An entry can sit in both tiers; it is counted once
+        removed = set(self.memory.invalidate(prefix) if self.memory is not None else ())
+        if self.disk is not None:
+            removed.update(
+                await asyncio.to_thread(self.disk.invalidate, sha256, method)
+            )
+        return len(removed)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory) if self.memory is not None else 0,
+            "memory_bytes": self.memory.current_bytes if self.memory is not None else 0,
+            "memory_max_bytes": self.memory.max_bytes if self.memory is not None else 0,
+            "disk_path": self.disk.path if self.disk is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
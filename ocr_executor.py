@@ -0,0 +1,206 @@
+"""
+Bounded process pool for CPU-bound OCR work
+Keeps OpenCV preprocessing and Tesseract off the FastAPI event loop
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the OCR queue is full and the job should be retried later"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("OCR queue is full")
+        self.retry_after = retry_after
+
+
+class ExecutorUnavailable(Exception):
+    """Raised when the pool broke again right after being rebuilt"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("OCR workers are unavailable")
+        self.retry_after = retry_after
+
+
+class OCRExecutor:
+    """Process pool with a fixed admission limit and per-job timeout
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a free worker. Anything beyond that is rejected immediately so
+    the caller can answer 429 instead of piling up work it cannot finish.
+
+    A worker process that dies (crash, OOM kill) breaks the whole pool. The
+    pool is then rebuilt and the job submitted once more; if that breaks too
+    the job fails with ExecutorUnavailable instead of retrying forever.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, job_timeout: float):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.job_timeout = job_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Jobs admitted and not yet finished in a worker (running + queued).
+        # Only touched from the event loop thread.
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._rejected = 0
+        self._restarts = 0
+        self._avg_job_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "OCRExecutor":
+        # Pre-forked servers (OCR_WORKERS) split the cores between their pools
+        server_workers = max(1, int(os.getenv("OCR_WORKERS", "1")))
+        workers = int(os.getenv("OCR_POOL_WORKERS", "0")) or max(
+            1, (os.cpu_count() or 1) // server_workers
+        )
+        return cls(
+            max_workers=workers,
+            max_queue=int(os.getenv("OCR_POOL_MAX_QUEUE", str(workers * 2))),
+            job_timeout=float(os.getenv("OCR_JOB_TIMEOUT_SECONDS", "60")),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Forking the server's process would copy its event loop and
+        # threads into the workers; forkserver starts them from a clean one
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+
+    def start(self):
+        if self._pool is None:
+            self._pool = self._new_pool()
+
+    @property
+    def broken(self) -> bool:
+        """Whether a worker process of the started pool has died"""
+        # ProcessPoolExecutor sets _broken as soon as it notices a dead worker,
+        # before anything is submitted to it
+        return self._pool is not None and bool(getattr(self._pool, "_broken", False))
+
+    def restart(self, pool: Optional[ProcessPoolExecutor] = None, kill: bool = False):
+        """Replace a broken pool; a no-op if ``pool`` was already replaced
+
+        With ``kill`` the old pool's workers are terminated, since shutting a
+        pool down never stops a job that is already running.
+        """
+        if pool is not None and pool is not self._pool:
+            return
+        old, self._pool = self._pool, self._new_pool()
+        self._restarts += 1
+        if old is None:
+            return
+        if kill:
+            for process in list((getattr(old, "_processes", None) or {}).values()):
+                process.terminate()
+        old.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a queue slot frees up"""
+        per_job = self._avg_job_seconds or 1.0
+        waves = max(1, self._in_flight - self.max_workers + 1) / self.max_workers
+        return max(1, math.ceil(per_job * waves))
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(*args)`` in a worker process
+
+        Raises ExecutorSaturated when the queue is full, asyncio.TimeoutError
+        when the job exceeds ``job_timeout`` and ExecutorUnavailable when the
+        pool breaks again after a rebuild.
+        """
+        if self._pool is None:
+            raise RuntimeError("OCR executor is not started")
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            raise ExecutorSaturated(self.retry_after())
+
+        for attempt in range(2):
+            pool = self._pool
+            try:
+                return await self._run_once(pool, fn, *args)
+            except BrokenProcessPool:
+                if attempt:
+                    raise ExecutorUnavailable(self.retry_after())
+                # Jobs that were on the dead pool all land here; only the
+                # first one replaces it
+                self.restart(pool)
+
+    async def _run_once(self, pool: ProcessPoolExecutor, fn, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self._in_flight += 1
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            # Never admitted, e.g. the pool is already broken
+            self._in_flight -= 1
+            raise
+        # A job that times out keeps its worker busy until it really finishes,
+        # so the slot is only released from the concurrent future's callback.
+        future.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(self._release, f, started)
+        )
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.job_timeout
+            )
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            if not future.cancel():
+                # The job is running and would hold its worker until it ends;
+                # other jobs on the killed pool are retried on the new one
+                self.restart(pool, kill=True)
+            raise
+
+    def _release(self, future, started: float):
+        self._in_flight -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
+        elapsed = time.monotonic() - started
+        # Exponential moving average keeps Retry-After responsive to load
+        if self._avg_job_seconds:
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+        else:
+            self._avg_job_seconds = elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        running = min(self._in_flight, self.max_workers)
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "job_timeout_seconds": self.job_timeout,
+            "running": running,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "utilization": round(running / self.max_workers, 3),
+            "completed": self._completed,
+            "failed": self._failed,
+            "timed_out": self._timed_out,
+            "rejected": self._rejected,
+            "restarts": self._restarts,
+            "broken": self.broken,
+            "avg_job_seconds": round(self._avg_job_seconds, 3),
+        }
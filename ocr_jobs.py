@@ -0,0 +1,310 @@
+"""
+Asynchronous OCR jobs
+Documents are queued with a priority and processed by in-process workers;
+clients poll for status, progress and the result, which is kept for a TTL.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Lower runs first; interactive single documents overtake bulk backfills
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    """One queued document and its progress"""
+
+    def __init__(
+        self,
+        engine: str,
+        priority: str,
+        filename: Optional[str],
+        sha256: str,
+        page_count: int,
+        ttl_seconds: float,
+    ):
+        self.id = uuid.uuid4().hex
+        self.engine = engine
+        self.priority = priority
+        self.filename = filename
+        self.sha256 = sha256
+        self.status = "queued"
+        self.pages_done = 0
+        self.page_count = page_count
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Set by finish(); a job never expires while it is queued or running
+        self.expires_at: Optional[float] = None
+        self.ttl_seconds = ttl_seconds
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def progress(self, pages_done: int, page_count: int):
+        self.pages_done = pages_done
+        self.page_count = page_count
+
+    def finish(
+        self,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ):
+        self.status = "failed" if error is not None else "succeeded"
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        # Retention is counted from completion, not submission
+        self.expires_at = self.finished_at + self.ttl_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "engine": self.engine,
+            "priority": self.priority,
+            "filename": self.filename,
+            "sha256": self.sha256,
+            "progress": {"pages_done": self.pages_done, "page_count": self.page_count},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobStore:
+    """Job records in memory, mirrored to SQLite when a path is configured
+
+    Live jobs are always served from memory. The SQLite file lets finished
+    results survive a restart and be read by other workers on the host.
+    """
+
+    def __init__(self, ttl_seconds: float, db_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        if self.db_path and self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_jobs ("
+                " id TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def add(self, job: Job):
+        self._jobs[job.id] = job
+
+    def persist(self, job: Job):
+        """Write a job's current state to SQLite (blocking; run in a thread)"""
+        if self._conn is None:
+            return
+        payload = json.dumps(job.to_dict(), separators=(",", ":"))
+        # Live rows sort after every expiry time until the job finishes
+        expires_at = job.expires_at if job.done else float("inf")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_jobs (id, payload, expires_at)"
+                " VALUES (?, ?, ?)",
+                (job.id, payload, expires_at),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state as a dict (blocking when it falls through to SQLite)"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.done and job.expires_at < time.time():
+                return None
+            return job.to_dict()
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM ocr_jobs WHERE id = ? AND expires_at >= ?",
+                (job_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.done and job.expires_at < now
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self._conn is not None:
+            with self._lock:
+                cur = self._conn.execute(
+                    "DELETE FROM ocr_jobs WHERE expires_at < ?", (now,)
+                )
+                self._conn.commit()
+            return len(expired) + cur.rowcount
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class JobScheduler:
+    """Priority queue drained by a fixed number of asyncio workers
+
+    Workers only await the OCR executor and Azure client, so a handful is
+    enough to keep both busy; the priority decides which document gets the
+    next free worker.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        store: JobStore,
+        describe_error: Optional[Callable[[Exception], Dict[str, Any]]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.store = store
+        # Turns a failed job's exception into its "error" field
+        self.describe_error = describe_error or (lambda e: {"detail": str(e)})
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Tie-breaker so equal priorities run first-in, first-out
+        self._sequence = itertools.count()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+
+    @classmethod
+    def from_env(
+        cls, describe_error: Optional[Callable[[Exception], Dict[str, Any]]] = None
+    ) -> "JobScheduler":
+        store = JobStore(
+            ttl_seconds=float(os.getenv("OCR_JOB_TTL_SECONDS", "3600")),
+            db_path=os.getenv("OCR_JOBS_DB") or None,
+        )
+        return cls(
+            workers=int(os.getenv("OCR_JOB_WORKERS", "4")),
+            max_queue=int(os.getenv("OCR_JOB_MAX_QUEUE", "1000")),
+            store=store,
+            describe_error=describe_error,
+        )
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self.store.open()
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            # Release anything still queued (e.g. spooled uploads)
+            while not self._queue.empty():
+                *_, cleanup = self._queue.get_nowait()
+                if cleanup is not None:
+                    cleanup()
+            self._queue = None
+        self.store.close()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(
+        self,
+        job: Job,
+        run: Callable[[Job], Awaitable[Dict[str, Any]]],
+        cleanup: Optional[Callable[[], None]] = None,
+    ):
+        """Queue ``run(job)``; raises JobQueueFull when at capacity
+
+        ``cleanup`` runs once the job has finished, failed or been dropped.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job scheduler is not started")
+        if self.queued >= self.max_queue:
+            raise JobQueueFull()
+        self.store.purge_expired()
+        self.store.add(job)
+        await asyncio.to_thread(self.store.persist, job)
+        self._queue.put_nowait(
+            (PRIORITIES[job.priority], next(self._sequence), job, run, cleanup)
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self):
+        while True:
+            _, _, job, run, cleanup = await self._queue.get()
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                # Workers sharing OCR_JOBS_DB see that the job has started
+                await asyncio.to_thread(self.store.persist, job)
+                result = await run(job)
+                job.finish(result=result)
+                self._completed += 1
+            except asyncio.CancelledError:
+                job.finish(error={"detail": "OCR service shutting down"})
+                raise
+            except Exception as e:
+                job.finish(error=self.describe_error(e))
+                self._failed += 1
+            finally:
+                self._running -= 1
+                if cleanup is not None:
+                    cleanup()
+                await asyncio.shield(asyncio.to_thread(self.store.persist, job))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retained": len(self.store),
+            "ttl_seconds": self.store.ttl_seconds,
+            "db_path": self.store.db_path,
+        }
@@ -0,0 +1,392 @@
+"""
+Prometheus metrics and per-request stage timing for the OCR service
+Metrics are kept with prometheus_client and rendered in the Prometheus text
+format at /metrics. Pre-forked workers share PROMETHEUS_MULTIPROC_DIR (set up
+by ocr_server.py), so any worker's /metrics reports the whole server. Stage
+timings of the current request can also be returned in a Server-Timing header.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+SIZE_BUCKETS = tuple(
+    float(kib * 1024) for kib in (16, 64, 256, 1024, 4096, 16384, 65536, 262144)
+)
+
+# Starlette appends "; charset=utf-8" to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Where every server worker writes its samples; unset for a single process
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+prometheus_client.disable_created_metrics()
+
+
+class _Metric:
+    """A prometheus_client metric, created the first time it is used
+
+    OCR pool processes import this module along with the app but never record
+    anything, so they leave no sample files in MULTIPROCESS_DIR.
+    """
+
+    factory: Callable[..., prometheus_client.metrics.MetricWrapperBase]
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), **options):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._options = options
+        self._registry: Optional[CollectorRegistry] = None
+        self._metric = None
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _child(self, key: Tuple[str, ...]):
+        if self._metric is None:
+            with self._lock:
+                if self._metric is None:
+                    self._metric = self.factory(
+                        self.name,
+                        self.help,
+                        self.labelnames,
+                        registry=self._registry,
+                        **self._options,
+                    )
+        return self._metric.labels(*key) if self.labelnames else self._metric
+
+
+class Counter(_Metric):
+    factory = prometheus_client.Counter
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._mirrored: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._child(self._key(labels)).inc(amount)
+
+    def set(self, value: float, **labels: str):
+        """Advance to a component's own running tally, e.g. at scrape"""
+        key = self._key(labels)
+        with self._lock:
+            delta = value - self._mirrored.get(key, 0.0)
+            self._mirrored[key] = value
+        # Touched even without a change, so zero tallies are still reported
+        child = self._child(key)
+        if delta > 0:
+            child.inc(delta)
+
+
+class Gauge(_Metric):
+    """A gauge; ``multiprocess_mode`` says how workers' values combine"""
+
+    factory = prometheus_client.Gauge
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        multiprocess_mode: str = "livesum",
+    ):
+        super().__init__(name, help, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def set(self, value: float, **labels: str):
+        self._child(self._key(labels)).set(value)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._child(self._key(labels)).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self._child(self._key(labels)).dec(amount)
+
+
+class Histogram(_Metric):
+    factory = prometheus_client.Histogram
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames, buckets=tuple(sorted(buckets)))
+
+    def observe(self, value: float, **labels: str):
+        self._child(self._key(labels)).observe(value)
+
+
+class Registry:
+    """Metrics plus collectors that refresh mirrored values before a scrape"""
+
+    def __init__(self):
+        self._registry = CollectorRegistry(auto_describe=True)
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        # With several processes the samples are read back from their files
+        metric._registry = None if MULTIPROCESS_DIR else self._registry
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def collect(self):
+        """Run the collectors
+
+        A scrape only runs them in the worker that serves it, so in
+        multiprocess mode every worker also calls this on a timer.
+        """
+        for collector in self._collectors:
+            collector()
+
+    def render(self) -> str:
+        self.collect()
+        if MULTIPROCESS_DIR is None:
+            return generate_latest(self._registry).decode("utf-8")
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+        return generate_latest(registry).decode("utf-8")
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "ocr_request_duration_seconds",
+        "HTTP request latency by endpoint",
+        ("endpoint", "method", "status"),
+    )
+)
+REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("ocr_requests_in_flight", "Requests being handled", ("endpoint",))
+)
+REQUEST_BYTES = REGISTRY.register(
+    Counter("ocr_request_bytes_total", "Request body bytes received", ("endpoint",))
+)
+RESPONSE_BYTES = REGISTRY.register(
+    Counter("ocr_response_bytes_total", "Response body bytes sent", ("endpoint",))
+)
+UPLOAD_BYTES = REGISTRY.register(
+    Histogram(
+        "ocr_upload_size_bytes", "Size of uploaded documents", buckets=SIZE_BUCKETS
+    )
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "ocr_stage_duration_seconds",
+        "Time spent in each processing stage",
+        ("stage",),
+    )
+)
+
+# Mirrored from the executor, cache, Azure client and job scheduler at scrape
+EXECUTOR_WORKERS = REGISTRY.register(
+    Gauge("ocr_executor_workers", "Worker processes in the OCR pool")
+)
+EXECUTOR_RUNNING = REGISTRY.register(
+    Gauge("ocr_executor_running", "OCR pool jobs running")
+)
+EXECUTOR_QUEUED = REGISTRY.register(
+    Gauge("ocr_executor_queued", "OCR pool jobs waiting for a worker")
+)
+EXECUTOR_JOBS = REGISTRY.register(
+    Counter("ocr_executor_jobs_total", "OCR pool jobs by outcome", ("outcome",))
+)
+EXECUTOR_RESTARTS = REGISTRY.register(
+    Counter("ocr_executor_restarts_total", "OCR pools rebuilt after a worker died")
+)
+AZURE_IN_FLIGHT = REGISTRY.register(
+    Gauge("ocr_azure_in_flight", "Azure analyses running or waiting for a slot")
+)
+AZURE_CIRCUIT_OPEN = REGISTRY.register(
+    Gauge(
+        "ocr_azure_circuit_open",
+        "1 while the Azure circuit breaker of any worker is open",
+        multiprocess_mode="livemax",
+    )
+)
+AZURE_CALLS = REGISTRY.register(
+    Counter(
+        "ocr_azure_calls_total",
+        "Azure analyses, retries, failed attempts and breaker rejections",
+        ("event",),
+    )
+)
+AZURE_RATE_LIMIT_WAIT = REGISTRY.register(
+    Counter(
+        "ocr_azure_rate_limit_wait_seconds_total",
+        "Time spent waiting for the client-side Azure TPS limit",
+    )
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    Counter("ocr_cache_lookups_total", "Result cache lookups", ("result",))
+)
+CACHE_HIT_RATIO = REGISTRY.register(
+    # A ratio does not add up across workers; each is reported with its pid
+    Gauge(
+        "ocr_cache_hit_ratio",
+        "Result cache hits over lookups since start",
+        multiprocess_mode="liveall",
+    )
+)
+CACHE_MEMORY_BYTES = REGISTRY.register(
+    Gauge("ocr_cache_memory_bytes", "Payload bytes in the in-memory cache tier")
+)
+JOBS_QUEUED = REGISTRY.register(Gauge("ocr_jobs_queued", "Background jobs queued"))
+JOBS_RUNNING = REGISTRY.register(Gauge("ocr_jobs_running", "Background jobs running"))
+JOBS_FINISHED = REGISTRY.register(
+    Counter("ocr_jobs_finished_total", "Background jobs by outcome", ("outcome",))
+)
+
+# /ocr/auto routing, to tune its thresholds against Azure spend
+AUTO_ROUTES = REGISTRY.register(
+    Counter(
+        "ocr_auto_routes_total",
+        "Documents routed by /ocr/auto",
+        ("engine", "reason"),
+    )
+)
+AUTO_CONFIDENCE = REGISTRY.register(
+    Histogram(
+        "ocr_auto_confidence",
+        "Mean Tesseract word confidence (0-100) of /ocr/auto documents",
+        buckets=tuple(range(10, 101, 10)),
+    )
+)
+AUTO_DENSITY = REGISTRY.register(
+    Histogram(
+        "ocr_auto_density",
+        "Recognised characters per megapixel of /ocr/auto documents",
+        buckets=(10.0, 25.0, 50.0, 100.0, 200.0, 400.0, 800.0, 1600.0),
+    )
+)
+
+# Stage timings of the request being handled, for the Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "ocr_request_timings", default=None
+)
+
+
+def observe_stage(name: str, seconds: float):
+    """Record a stage duration in the histogram and the current request"""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        # Pages run in parallel, so per-request totals are summed work time
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """Request latency, in-flight and byte metrics, plus optional Server-Timing
+
+    Endpoints are labelled by their route template (``/ocr/jobs/{job_id}``) so
+    label cardinality stays bounded; unknown paths share one label.
+    """
+
+    def __init__(
+        self, app: ASGIApp, routes: Sequence[BaseRoute], server_timing: bool = False
+    ):
+        self.app = app
+        self.routes = routes
+        self.server_timing = server_timing
+
+    def endpoint(self, scope: Scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        endpoint = self.endpoint(scope)
+        status = "500"
+        received = 0
+        sent = 0
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def timed_send(message: Message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                if self.server_timing:
+                    header = server_timing(timings, time.perf_counter() - started)
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", []))
+                        + [(b"server-timing", header.encode("latin-1"))],
+                    }
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            await self.app(scope, counting_receive, timed_send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+            _request_timings.reset(token)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint,
+                method=scope["method"],
+                status=status,
+            )
+            REQUEST_BYTES.inc(received, endpoint=endpoint)
+            RESPONSE_BYTES.inc(sent, endpoint=endpoint)
@@ -0,0 +1,203 @@
+"""
+Named Tesseract profiles and the engine that runs them
+A profile fixes the language packs, page segmentation mode and character
+whitelist for one kind of document; requests pick one by name. Text is
+recognised through a long-lived tesserocr API per worker process when that
+package is installed, otherwise through the tesseract CLI via pytesseract.
+"""
+
+import json
+import os
+import shlex
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Characters that occur in lab-value tables: analyte names, values, units and
+# reference ranges. Leaving out |, _, [, ] and similar stops ruling lines from
+# being read as text.
+LAB_TABLE_CHARS = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,:;-+/%<>()=^*"
+)
+NUMERIC_CHARS = "0123456789.,-+/%<>"
+
+
+class Profile(NamedTuple):
+    """Tesseract settings for one kind of document"""
+
+    name: str
+    lang: str = "eng"
+    # Page segmentation mode: 3 automatic, 4 single column, 6 uniform block,
+    # 7 single line, 11 sparse text
+    psm: int = 3
+    whitelist: Optional[str] = None
+    # Keep runs of spaces between words so table columns stay apart
+    preserve_spaces: bool = False
+
+    def config(self) -> str:
+        """Command-line options for the tesseract CLI"""
+        options = [f"--psm {self.psm}"]
+        if self.whitelist:
+            options.append(f"-c tessedit_char_whitelist={shlex.quote(self.whitelist)}")
+        if self.preserve_spaces:
+            options.append("-c preserve_interword_spaces=1")
+        return " ".join(options)
+
+    def cache_params(self) -> Dict[str, Any]:
+        """Settings that change the output; the name alone is not enough"""
+        return self._asdict()
+
+
+PROFILES: Dict[str, Profile] = {
+    # Tesseract's own defaults; the original behaviour of /ocr/tesseract
+    "default": Profile("default"),
+    # One block of text, e.g. a cropped report section or ECG interpretation
+    "block": Profile("block", psm=6),
+    # Scattered labels and values on forms and ECG printouts
+    "sparse": Profile("sparse", psm=11),
+    "lab_table": Profile(
+        "lab_table", psm=6, whitelist=LAB_TABLE_CHARS, preserve_spaces=True
+    ),
+    # Cropped value columns: numbers, ranges and comparison signs only
+    "numeric": Profile("numeric", psm=6, whitelist=NUMERIC_CHARS),
+    "multilingual": Profile("multilingual", lang="eng+spa"),
+}
+
+
+def load_profiles(spec: Optional[str]) -> Dict[str, Profile]:
+    """Built-in profiles plus those defined in a JSON object
+
+    ``{"cardio_fr": {"lang": "eng+fra", "psm": 4}}`` adds or replaces the
+    named profile. Raises ValueError on malformed definitions.
+    """
+    profiles = dict(PROFILES)
+    if not spec:
+        return profiles
+    try:
+        definitions = json.loads(spec)
+        for name, fields in definitions.items():
+            profiles[name] = Profile(name=name, **fields)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid Tesseract profile definitions: {e}")
+    return profiles
+
+
+# "api" keeps a tesserocr engine per worker process and language set, "cli"
+# runs the tesseract binary per page; "auto" uses the API when installed
+OCR_TESSERACT_ENGINE = os.getenv("OCR_TESSERACT_ENGINE", "auto").lower()
+
+
+def engine_name() -> str:
+    if OCR_TESSERACT_ENGINE == "cli" or tesserocr is None:
+        return "cli"
+    return "api"
+
+
+# Engines of this worker process by language string; each holds its loaded
+# traineddata, so only the first page per language pays the model load
+_apis: Dict[str, Any] = {}
+
+
+def _api(lang: str):
+    api = _apis.get(lang)
+    if api is None:
+        api = _apis[lang] = tesserocr.PyTessBaseAPI(lang=lang)
+    return api
+
+
+def _configure(api, profile: Profile):
+    # Variables persist on the engine, so every page resets all of them
+    api.SetPageSegMode(profile.psm)
+    api.SetVariable("tessedit_char_whitelist", profile.whitelist or "")
+    api.SetVariable(
+        "preserve_interword_spaces", "1" if profile.preserve_spaces else "0"
+    )
+
+
+def image_to_string(image: Image.Image, profile: Profile) -> str:
+    """Recognise the text of one page with the given profile"""
+    if engine_name() == "cli":
+        return pytesseract.image_to_string(
+            image, lang=profile.lang, config=profile.config()
+        )
+    api = _api(profile.lang)
+    _configure(api, profile)
+    api.SetImage(image)
+    try:
+        return api.GetUTF8Text()
+    finally:
+        api.Clear()
+
+
+# Columns of a page's word data, one list per field with one entry per word
+WORD_FIELDS = ("text", "left", "top", "width", "height", "confidence", "line")
+
+
+def parse_tsv(tsv: str) -> Tuple[str, Dict[str, List[Any]]]:
+    """Page text and word columns from Tesseract's TSV output
+
+    Only word rows (level 5) are kept. ``line`` numbers the text lines of the
+    page from 0; the text joins each line's words with single spaces and
+    leaves a blank line between paragraphs, as Tesseract's text output does.
+    """
+    words: Dict[str, List[Any]] = {field: [] for field in WORD_FIELDS}
+    lines: List[List[str]] = []
+    line_keys: Dict[Tuple[str, str, str], int] = {}
+    paragraph = None
+    for row in tsv.splitlines()[1:]:
+        cells = row.split("\t")
+        if len(cells) < 12 or cells[0] != "5" or not cells[11].strip():
+            continue
+        key = (cells[2], cells[3], cells[4])
+        line = line_keys.get(key)
+        if line is None:
+            if paragraph is not None and key[:2] != paragraph:
+                lines.append([])
+            paragraph = key[:2]
+            line = line_keys[key] = len(line_keys)
+            lines.append([])
+        lines[-1].append(cells[11])
+        words["text"].append(cells[11])
+        words["left"].append(int(cells[6]))
+        words["top"].append(int(cells[7]))
+        words["width"].append(int(cells[8]))
+        words["height"].append(int(cells[9]))
+        words["confidence"].append(round(float(cells[10])))
+        words["line"].append(line)
+    text = "".join(" ".join(line) + "\n" for line in lines)
+    return text, words
+
+
+def image_to_data(
+    image: Image.Image, profile: Profile
+) -> Tuple[str, Dict[str, List[Any]]]:
+    """Text plus word boxes and confidences from a single recognition pass"""
+    if engine_name() == "cli":
+        tsv = pytesseract.image_to_data(
+            image, lang=profile.lang, config=profile.config()
+        )
+        return parse_tsv(tsv)
+    api = _api(profile.lang)
+    _configure(api, profile)
+    api.SetImage(image)
+    try:
+        # GetTSVText reuses the recognition done for GetUTF8Text
+        text = api.GetUTF8Text()
+        _, words = parse_tsv("header\n" + api.GetTSVText(0))
+        return text, words
+    finally:
+        api.Clear()
+
+
+def filter_words(
+    words: Dict[str, List[Any]], min_confidence: float
+) -> Dict[str, List[Any]]:
+    """Word columns without the words below ``min_confidence`` (0-100)"""
+    keep = [i for i, conf in enumerate(words["confidence"]) if conf >= min_confidence]
+    return {field: [values[i] for i in keep] for field, values in words.items()}
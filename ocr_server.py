@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Pre-forked production launcher for the OCR service
+The parent imports the app and binds the listening socket once, then forks N
+workers that share both. Each worker runs its own event loop, lifespan (OCR
+pool, Azure client, warm-up) and accepts connections from the shared socket.
+Metrics and job records are shared through files, so any worker can answer
+/metrics and job status polls.
+
+Usage:
+    python ocr_server.py --workers 4
+    OCR_WORKERS=4 python ocr_app.py
+"""
+
+import argparse
+import glob
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+logger = logging.getLogger(__name__)
+
+# Workers that exit sooner than this after starting are not restarted in a
+# loop; the parent stops instead so a broken deploy fails visibly
+MIN_WORKER_UPTIME_SECONDS = 5.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _share_state() -> Optional[str]:
+    """Point the workers at one metrics directory and one jobs database
+
+    Must run before prometheus_client is imported. Returns the temporary
+    directory created for them, if any, to be removed on exit.
+    """
+    runtime = None
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        runtime = tempfile.mkdtemp(prefix="ocr-server-")
+        metrics_dir = os.path.join(runtime, "metrics")
+        os.mkdir(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    else:
+        # Samples left by a previous run would be added to this one's
+        for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+            os.remove(path)
+    if not os.getenv("OCR_JOBS_DB"):
+        # Jobs run in the worker that accepted them; polls land on any worker
+        if runtime is None:
+            runtime = tempfile.mkdtemp(prefix="ocr-server-")
+        os.environ["OCR_JOBS_DB"] = os.path.join(runtime, "jobs.db")
+        logger.warning(
+            f"OCR_JOBS_DB is not set; workers share job records in "
+            f"{os.environ['OCR_JOBS_DB']} until the server stops"
+        )
+    return runtime
+
+
+def _run_worker(app, sock: socket.socket, log_level: str):
+    # The parent's handlers only forward signals; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def serve(
+    app_path: str = "ocr_app:app",
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 1,
+    log_level: str = "info",
+):
+    """Run the app with ``workers`` pre-forked processes
+
+    One worker runs uvicorn directly. Platforms without fork fall back to
+    uvicorn's own multi-process mode, which imports the app in every worker.
+    """
+    # Read when the app is imported: each worker's OCR pool gets its share of
+    # the cores and its share of AZURE_TPS
+    os.environ["OCR_WORKERS"] = str(max(1, workers))
+    if workers <= 1:
+        uvicorn.run(app_path, host=host, port=port, log_level=log_level)
+        return
+    runtime = _share_state()
+    if not hasattr(os, "fork"):
+        try:
+            uvicorn.run(
+                app_path, host=host, port=port, workers=workers, log_level=log_level
+            )
+        finally:
+            if runtime is not None:
+                shutil.rmtree(runtime, ignore_errors=True)
+        return
+
+    from prometheus_client import multiprocess
+
+    # Import once so cv2, NumPy and the app's module state are shared
+    # copy-on-write by every worker instead of loaded N times
+    app = import_from_string(app_path)
+    sock = _bind(host, port)
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+        logger.info(f"Started OCR worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info(f"Listening on {host}:{port} with {workers} workers")
+    for _ in range(workers):
+        spawn()
+
+    exit_code = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if started is None:
+            continue
+        # Its in-flight and other live gauges no longer count
+        multiprocess.mark_process_dead(pid)
+        if stopping:
+            continue
+        uptime = time.monotonic() - started
+        logger.error(f"OCR worker {pid} exited (status {status}) after {uptime:.1f}s")
+        if uptime < MIN_WORKER_UPTIME_SECONDS:
+            # Crashing on startup; restarting would only spin
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        spawn()
+
+    sock.close()
+    if runtime is not None:
+        shutil.rmtree(runtime, ignore_errors=True)
+    sys.exit(exit_code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--app", default="ocr_app:app")
+    parser.add_argument("--host", default=os.getenv("OCR_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("OCR_PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("OCR_WORKERS", "1"))
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.app, args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Incremental OCR responses
+Pages are written as NDJSON lines or server-sent events as soon as they are ready
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def validate_stream_format(stream: str) -> str:
+    if stream not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"stream must be one of: {', '.join(STREAM_FORMATS)}",
+        )
+    return stream
+
+
+def encode_event(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    """Serialize one event; NDJSON carries the event name in a "type" field"""
+    if fmt == "sse":
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+    payload = json.dumps(
+        {"type": event, **data}, ensure_ascii=False, separators=(",", ":")
+    )
+    return f"{payload}\n".encode("utf-8")
+
+
+def stream_events(
+    events: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    fmt: str,
+    on_close: Optional[Callable[[], None]] = None,
+) -> StreamingResponse:
+    """Wrap an async iterator of (event, data) pairs in a streaming response
+
+    Headers are already sent by the time a page fails, so errors are reported
+    as a final "error" event instead of an HTTP status. ``on_close`` runs once
+    the response finishes, including when the client disconnects early.
+    """
+
+    async def body():
+        try:
+            async for event, data in events:
+                yield encode_event(fmt, event, data)
+        except Exception as e:
+            detail = str(e) or type(e).__name__
+            logger.error(f"Streaming OCR error: {detail}")
+            yield encode_event(fmt, "error", {"detail": detail})
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_FORMATS[fmt],
+        # Disable proxy buffering so each page reaches the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(on_close) if on_close else None,
+    )
@@ -0,0 +1,82 @@
+"""
+Compact tables from Azure prebuilt-layout results
+Tables are indexed by page once per analyze result and emitted as row/column
+grids (or CSV) instead of one dict per cell.
+"""
+
+import csv
+import io
+from typing import Any, Dict, List, Optional
+
+TABLE_FORMATS = ("grid", "csv")
+
+
+def tables_by_page(tables) -> Dict[int, List[Any]]:
+    """Map page number -> tables with a bounding region on that page
+
+    One pass over the tables and their regions; a table continuing across
+    pages is listed under each of them.
+    """
+    index: Dict[int, List[Any]] = {}
+    for table in tables or []:
+        pages = {region.page_number for region in table.bounding_regions or []}
+        for page_number in sorted(pages):
+            index.setdefault(page_number, []).append(table)
+    return index
+
+
+def table_grid(table) -> Dict[str, Any]:
+    """A table as a grid of cell texts
+
+    ``rows[r][c]`` is the content of the cell starting there. A merged cell's
+    content sits in its top-left position, the positions it covers are null
+    and its extent is listed in ``spans`` as [row, column, row_span,
+    column_span]. ``header_rows`` lists the rows holding column headers.
+    """
+    rows: List[List[Optional[str]]] = [
+        [""] * table.column_count for _ in range(table.row_count)
+    ]
+    spans: List[List[int]] = []
+    header_rows = set()
+    for cell in table.cells:
+        row_span = cell.row_span or 1
+        column_span = cell.column_span or 1
+        if row_span > 1 or column_span > 1:
+            spans.append([cell.row_index, cell.column_index, row_span, column_span])
+            for r in range(cell.row_index, cell.row_index + row_span):
+                for c in range(cell.column_index, cell.column_index + column_span):
+                    rows[r][c] = None
+        rows[cell.row_index][cell.column_index] = cell.content
+        if cell.kind == "columnHeader":
+            header_rows.add(cell.row_index)
+    grid = {
+        "row_count": table.row_count,
+        "column_count": table.column_count,
+        "header_rows": sorted(header_rows),
+        "rows": rows,
+    }
+    if spans:
+        grid["spans"] = spans
+    return grid
+
+
+def grid_to_csv(grid: Dict[str, Any]) -> str:
+    """CSV text of a grid; positions covered by merged cells are empty"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(
+        ["" if value is None else value for value in row] for row in grid["rows"]
+    )
+    return buffer.getvalue()
+
+
+def format_tables(
+    pages: List[Dict[str, Any]], table_format: str
+) -> List[Dict[str, Any]]:
+    """Pages with their table grids converted to ``table_format``"""
+    if table_format == "grid":
+        return pages
+    return [
+        {**page, "tables": [grid_to_csv(grid) for grid in page["tables"]]}
+        for page in pages
+    ]
@@ -0,0 +1,300 @@
+"""
+Size-capped upload handling for OCR endpoints
+Uploads are read in chunks with a hard byte limit, hashed on the fly, and
+spooled to a named temp file when large so worker processes can map the file
+instead of receiving a pickled copy of the bytes for every page.
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CHUNK_SIZE = 1024 * 1024
+
+# What worker processes receive: the bytes themselves, or a spool file path
+Source = Union[bytes, str]
+
+
+class Upload:
+    """An uploaded document held in memory or in a spool file"""
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        sha256: str,
+        size: int,
+        data: Optional[bytes] = None,
+        path: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.sha256 = sha256
+        self.size = size
+        self.data = data
+        self.path = path
+
+    @property
+    def source(self) -> Source:
+        return self.path if self.path is not None else self.data
+
+    def head(self, n: int = 8) -> bytes:
+        return read_head(self.source, n)
+
+    def open_document(self) -> Union[bytes, BinaryIO]:
+        """Body for an outbound request; callers close file handles they get"""
+        if self.path is not None:
+            return open(self.path, "rb")
+        return self.data
+
+    def close(self):
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self.data = None
+
+
+class _UploadWriter:
+    """Accumulates chunks under a byte limit, spilling to disk past a threshold"""
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        max_bytes: int,
+        spool_bytes: int,
+        spool_dir: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.spool_dir = spool_dir
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.chunks = []
+        self.spool = None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {self.max_bytes} byte limit",
+            )
+        self.digest.update(chunk)
+        if self.spool is None and self.size > self.spool_bytes:
+            self.spool = tempfile.NamedTemporaryFile(
+                prefix="ocr-upload-", dir=self.spool_dir, delete=False
+            )
+            self.spool.writelines(self.chunks)
+            self.chunks = []
+        if self.spool is not None:
+            self.spool.write(chunk)
+        else:
+            self.chunks.append(chunk)
+
+    def finish(self) -> Upload:
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        sha256 = self.digest.hexdigest()
+        if self.spool is not None:
+            self.spool.close()
+            return Upload(self.filename, sha256, self.size, path=self.spool.name)
+        # A single-chunk upload (the common case) is used as-is without copying
+        chunks = self.chunks
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        return Upload(self.filename, sha256, self.size, data=data)
+
+    def discard(self):
+        if self.spool is not None:
+            self.spool.close()
+            os.unlink(self.spool.name)
+            self.spool = None
+        self.chunks = []
+
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: int,
+    spool_bytes: int,
+    spool_dir: Optional[str] = None,
+) -> Upload:
+    """Read an upload in chunks, enforcing ``max_bytes`` while reading
+
+    Files up to ``spool_bytes`` stay in memory as a single bytes object; larger
+    files are written to a named temp file that worker processes can mmap.
+    Raises 413 as soon as the limit is crossed and 400 for empty files.
+    """
+    writer = _UploadWriter(file.filename, max_bytes, spool_bytes, spool_dir)
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+        return writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def is_zip(upload: Upload) -> bool:
+    return upload.head(4) == b"PK\x03\x04"
+
+
+def extract_zip(
+    upload: Upload,
+    max_files: int,
+    max_bytes: int,
+    spool_bytes: int,
+    spool_dir: Optional[str] = None,
+    max_total_bytes: Optional[int] = None,
+) -> List[Tuple[str, Union[Upload, HTTPException]]]:
+    """Unpack an archive into per-member uploads (blocking; run in a thread)
+
+    Members are streamed out of the archive under the same size limit as a
+    direct upload, so an oversized member fails with 413 for that member only.
+    Once all members together unpack to more than ``max_total_bytes`` the
+    whole archive fails with 413, which stops a bomb of many small members.
+    Directories and macOS resource forks are skipped.
+    """
+    members: List[Tuple[str, Union[Upload, HTTPException]]] = []
+    budget = float("inf") if max_total_bytes is None else max_total_bytes
+    unpacked = 0
+    try:
+        with open_source(upload.source) as raw, zipfile.ZipFile(raw) as archive:
+            infos = [
+                info
+                for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+            if len(infos) > max_files:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Archive has {len(infos)} files; limit is {max_files}",
+                )
+            for info in infos:
+                name = f"{upload.filename}/{info.filename}"
+                writer = _UploadWriter(name, max_bytes, spool_bytes, spool_dir)
+                try:
+                    with archive.open(info) as member:
+                        for chunk in iter(lambda: member.read(CHUNK_SIZE), b""):
+                            unpacked += len(chunk)
+                            if unpacked > budget:
+                                raise HTTPException(
+                                    status_code=413,
+                                    detail="Archive contents exceed the batch size limit",
+                                )
+                            writer.write(chunk)
+                    members.append((name, writer.finish()))
+                except HTTPException as e:
+                    writer.discard()
+                    if unpacked > budget:
+                        raise
+                    members.append((name, e))
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {e}")
+    except BaseException:
+        for _, member in members:
+            if isinstance(member, Upload):
+                member.close()
+        raise
+    return members
+
+
+def read_head(source: Source, n: int = 8) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read(n)
+    return bytes(source[:n])
+
+
+@contextmanager
+def source_buffer(source: Source) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Zero-copy buffer over a source; spool files are memory-mapped"""
+    if not isinstance(source, str):
+        yield source
+        return
+    with open(source, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def open_source(source: Source) -> BinaryIO:
+    """File-like view of a source for PIL and other stream readers"""
+    if isinstance(source, str):
+        return open(source, "rb")
+    # BytesIO shares the bytes object's buffer until written to
+    return io.BytesIO(source)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies over a byte limit before multipart parsing
+
+    Requests that declare a Content-Length above the limit get 413 without
+    reading the body; chunked requests are counted as they stream in.
+    ``path_limits`` overrides the limit for specific paths such as batches.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_bytes: int,
+        path_prefix: str = "/ocr/",
+        path_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefix = path_prefix
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+        headers = dict(scope["headers"])
+        declared = headers.get(b"content-length")
+        if declared is not None and int(declared) > max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised inside form parsing, so FastAPI turns it into a 413
+                    raise HTTPException(
+                        status_code=413, detail="Request body too large"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Send):
+        body = b'{"detail":"Request body too large"}'
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
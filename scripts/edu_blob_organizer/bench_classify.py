@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the filename rules in classifiers.classify
+Classifies synthetic filenames (no content peek) with the rule tables built at
+import and with the previous rule-by-rule scans, checks that both give the same
+tags and reports filenames per second for each.
+
+Usage:
+    python bench_classify.py
+    python bench_classify.py --count 1000000 --seed 7
+    python bench_classify.py --processes 8
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from classifiers import (
+    CONDITIONS,
+    FILENAME_YEAR_RE,
+    SOURCE_ORGS,
+    classify,
+    classify_many,
+)
+
+# Fragments of real-looking education filenames: rule keywords, near misses
+# and neutral words, so every rule and the fallbacks are exercised
+WORDS = [
+    "guideline",
+    "Guidelines",
+    "slides",
+    "deck",
+    "keynote",
+    "Goldman-Cecil",
+    "chapter",
+    "RCT",
+    "randomised",
+    "trial",
+    "Meta-Analysis",
+    "systematic",
+    "protocol",
+    "pathway",
+    "calculator",
+    "score",
+    "figure",
+    "notes",
+    "dataset",
+    "website",
+    "archive",
+    "st elevation",
+    "acute coronary",
+    "atrial fibrillation",
+    "heart failure",
+    "valve",
+    "pericardial",
+    "htn",
+    "peripheral artery",
+    "electrophysiology",
+    "American Heart Association",
+    "european society of cardiology",
+    "clinical information system",
+    "A-CC",
+    "ES-C",
+    "management",
+    "update",
+    "case",
+    "teaching",
+    "final",
+    "v2",
+    "copy",
+    "lecture",
+    "summary",
+]
+WORDS += CONDITIONS + SOURCE_ORGS
+EXTENSIONS = [".pdf", ".pptx", ".docx", ".png", ".jpg", ".md", ".txt", ".csv", ".mhtml"]
+SEPARATORS = ["_", "-", " ", "."]
+
+
+def synthetic_filenames(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        parts = rng.sample(WORDS, rng.randint(1, 5))
+        if rng.random() < 0.6:
+            parts.append(str(rng.randint(1990, 2029)))
+        names.append(rng.choice(SEPARATORS).join(parts) + rng.choice(EXTENSIONS))
+    return names
+
+
+def legacy_classify(filename: str) -> Dict[str, str]:
+    """classify(filename) as it was before the rule tables: each rule scanned
+    in turn, with its keyword list rebuilt on every call"""
+    base = filename.lower()
+    doc_type = ""
+    condition = ""
+    source_org = ""
+    year = ""
+    evidence_level = ""
+    needs_review = "no"
+
+    # docType heuristics
+    if any(k in base for k in ["guideline", "guidelines"]):
+        doc_type = "guideline"
+        evidence_level = "guideline"
+    elif any(k in base for k in ["slide", "deck", "ppt", "keynote"]):
+        doc_type = "slide_deck"
+    elif any(k in base for k in ["textbook", "chapter", "goldman", "cecil"]):
+        doc_type = "textbook_chapter"
+        source_org = "Goldman-Cecil"
+    elif any(k in base for k in ["rct", "randomized", "randomised", "trial"]):
+        doc_type = "article_RCT"
+        evidence_level = "RCT"
+    elif any(
+        k in base for k in ["review", "meta-analysis", "metaanalysis", "systematic"]
+    ):
+        doc_type = "review"
+        evidence_level = "review"
+    elif any(k in base for k in ["protocol", "handout", "workflow", "pathway"]):
+        doc_type = "protocol_handout"
+    elif any(k in base for k in ["calc", "calculator", "score"]):
+        doc_type = "calculator"
+    elif any(k in base for k in ["figure", "image", "jpg", "jpeg", "png", "svg"]):
+        doc_type = "image_figure"
+    elif any(k in base for k in ["notes", "note", "md", "txt"]):
+        doc_type = "notes"
+    elif any(k in base for k in ["dataset", "csv", "xlsx", "jsonl", "parquet"]):
+        doc_type = "dataset"
+    elif any(k in base for k in ["snapshot", "website", "web", "archive", "mhtml"]):
+        doc_type = "website_snapshot"
+
+    # condition heuristics
+    for cond in CONDITIONS:
+        if cond.lower() in base:
+            condition = cond
+            break
+    if not condition:
+        if any(k in base for k in ["stemi", "st elevation"]):
+            condition = "STEMI"
+        elif any(k in base for k in ["nstemi"]):
+            condition = "NSTEMI"
+        elif any(k in base for k in ["omi"]):
+            condition = "OMI"
+        elif any(k in base for k in ["acs", "acute coronary"]):
+            condition = "ACS"
+        elif any(k in base for k in ["af", "atrial fibrillation"]):
+            condition = "AF"
+        elif any(k in base for k in ["hf", "heart failure"]):
+            condition = "HF"
+        elif any(k in base for k in ["hcm"]):
+            condition = "HCM"
+        elif any(k in base for k in ["valv", "valve"]):
+            condition = "valvular"
+        elif any(k in base for k in ["pericard"]):
+            condition = "pericarditis"
+        elif any(k in base for k in ["syncope"]):
+            condition = "syncope"
+        elif any(k in base for k in ["hypertension", "htn"]):
+            condition = "hypertension"
+        elif any(k in base for k in ["pad", "peripheral artery"]):
+            condition = "PAD"
+        elif any(k in base for k in ["ep", "electrophysiol"]):
+            condition = "EP"
+        elif any(k in base for k in ["congenital"]):
+            condition = "congenital"
+        else:
+            condition = "cardiology_general"
+
+    # source_org
+    for org in SOURCE_ORGS:
+        if org.lower().replace("-", "") in base.replace("-", ""):
+            source_org = org
+            break
+    if not source_org:
+        if any(k in base for k in ["acc", "american college of cardiology"]):
+            source_org = "ACC"
+        elif any(k in base for k in ["aha", "american heart association"]):
+            source_org = "AHA"
+        elif any(k in base for k in ["esc", "european society of cardiology"]):
+            source_org = "ESC"
+        elif any(k in base for k in ["nejm"]):
+            source_org = "NEJM"
+        elif any(k in base for k in ["jama"]):
+            source_org = "JAMA"
+        elif any(k in base for k in ["lancet"]):
+            source_org = "Lancet"
+        elif any(k in base for k in ["cis", "clinical information system"]):
+            source_org = "CIS"
+        else:
+            source_org = "internal"
+
+    m = FILENAME_YEAR_RE.search(filename)
+    if m:
+        year = m.group("year")
+    if not doc_type:
+        needs_review = "yes"
+        doc_type = "notes"
+    if not year:
+        year = "unknown"
+
+    return {
+        "docType": doc_type,
+        "condition": condition,
+        "source_org": source_org,
+        "year": year,
+        "audience": "clinician",
+        "evidence_level": evidence_level,
+        "retention_class": "refresh_annual",
+        "phi": "no",
+        "needs_review": needs_review,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Also time classify_many sharded across N processes",
+    )
+    args = parser.parse_args()
+
+    names = synthetic_filenames(args.count, args.seed)
+    print(f"{len(names)} synthetic filenames")
+
+    started = time.perf_counter()
+    legacy = [legacy_classify(name) for name in names]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = [classify(name) for name in names]
+    compiled_seconds = time.perf_counter() - started
+
+    timings = [("legacy", legacy_seconds), ("rule tables", compiled_seconds)]
+    if args.processes:
+        started = time.perf_counter()
+        many = [tags for _, tags in classify_many(names, processes=args.processes)]
+        timings.append((f"many x{args.processes}", time.perf_counter() - started))
+        compiled = [
+            tags if tags == other else {} for tags, other in zip(compiled, many)
+        ]
+
+    mismatches = [
+        (name, old, new)
+        for name, old, new in zip(names, legacy, compiled)
+        if old != new
+    ]
+    for name, old, new in mismatches[:10]:
+        print(f"MISMATCH {name!r}: {old} != {new}")
+
+    for label, seconds in timings:
+        print(f"{label:>14}: {seconds:6.2f}s  {len(names) / seconds:>10,.0f} names/s")
+    print(f"{'speedup':>14}: {legacy_seconds / compiled_seconds:.2f}x")
+    print(f"{'mismatches':>14}: {len(mismatches)}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
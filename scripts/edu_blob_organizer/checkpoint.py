@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Checkpoints are rewritten at most this often while blobs complete, and
+# always when the run stops
+SAVE_INTERVAL_SECONDS = 2.0
+
+
+class RunCheckpoint:
+    """
+    Progress of an organizer run, saved as JSON so --resume can skip finished work.
+
+    Listing pages are tracked in order. ``token`` is the continuation token of
+    the first page that still has unfinished blobs, so a resumed run lists
+    from there instead of from the start. ``completed`` holds the finished
+    source paths from that page on; earlier pages are covered by the token.
+    A blob is finished once its ok audit row has been written. A blob that
+    failed stays pending, so the token stays at its page and a resumed run
+    tries it again. ``mode`` (dry-run, tag-only or move) is saved too: a dry
+    run's checkpoint must not make a real run skip blobs it never moved.
+    """
+
+    def __init__(self, path: str, container: str, prefix: str, mode: str):
+        self.path = path
+        self.container = container
+        self.prefix = prefix
+        self.mode = mode
+        self.token: Optional[str] = None
+        self.finished = False
+        # Loaded from a previous run's file
+        self.resumed = False
+        # Paths finished by the run being resumed that listing has not reached
+        self._carried: Set[str] = set()
+        # Pages listed in this run, oldest first, until all their blobs finish
+        self._pages: List[Dict[str, Any]] = []
+        self._listed_all = False
+        self._saved_at = 0.0
+
+    @classmethod
+    def load(cls, path: str, container: str, prefix: str, mode: str) -> "RunCheckpoint":
+        """Checkpoint saved at ``path``, or a fresh one if there is none"""
+        checkpoint = cls(path, container, prefix, mode)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("container") != container or state.get("prefix") != prefix:
+            raise ValueError(
+                f"Checkpoint {path} is for container '{state.get('container')}' "
+                f"and prefix '{state.get('prefix')}'"
+            )
+        if state.get("mode") != mode:
+            raise ValueError(
+                f"Checkpoint {path} is from a run in {state.get('mode')} mode, "
+                f"not {mode}"
+            )
+        checkpoint.resumed = True
+        checkpoint.token = state.get("token")
+        checkpoint.finished = bool(state.get("finished"))
+        checkpoint._carried = set(state.get("completed") or [])
+        return checkpoint
+
+    def is_completed(self, name: str) -> bool:
+        return name in self._carried
+
+    def page_listed(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        pending: Iterable[str],
+        skipped: Iterable[str],
+    ):
+        """Record a listing page: its tokens, blobs to process and blobs skipped"""
+        done = set(skipped)
+        self._carried -= done
+        self._pages.append(
+            {"start": start, "end": end, "pending": set(pending), "done": done}
+        )
+        self._advance()
+
+    def listing_finished(self):
+        self._listed_all = True
+        self._advance()
+
+    def mark_done(self, name: str):
+        for page in self._pages:
+            if name in page["pending"]:
+                page["pending"].discard(name)
+                page["done"].add(name)
+                break
+        self._advance()
+
+    def _advance(self):
+        # Pages whose blobs have all finished are covered by the next token
+        while self._pages and not self._pages[0]["pending"]:
+            page = self._pages.pop(0)
+            self.token = page["end"]
+            if page["end"] is None:
+                # That was the last page
+                self.finished = True
+        if self._pages:
+            self.token = self._pages[0]["start"]
+        elif self._listed_all:
+            self.finished = True
+
+    def save(self):
+        completed = set(self._carried)
+        for page in self._pages:
+            completed |= page["done"]
+        state = {
+            "container": self.container,
+            "prefix": self.prefix,
+            "mode": self.mode,
+            "token": self.token,
+            "completed": sorted(completed),
+            "finished": self.finished,
+            "updated": datetime.now(timezone.utc).isoformat(),
+        }
+        # Written to a temporary file first so a crash never leaves half a file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def save_periodically(self):
+        if time.monotonic() - self._saved_at >= SAVE_INTERVAL_SECONDS:
+            self.save()
+
+
+def iter_blobs(container_client, prefix: str, checkpoint: RunCheckpoint):
+    """Blobs to process, page by page from the checkpoint's continuation token
+
+    Virtual directories and blobs the checkpoint marks as completed are skipped.
+    """
+    pages = container_client.list_blobs(name_starts_with=prefix).by_page(
+        continuation_token=checkpoint.token
+    )
+    start = checkpoint.token
+    for page in pages:
+        # Set once the page has been fetched; lists from the following page
+        end = pages.continuation_token
+        pending, skipped = [], []
+        for b in page:
+            if b.name.endswith("/"):
+                continue
+            if checkpoint.is_completed(b.name):
+                skipped.append(b.name)
+            else:
+                pending.append(b)
+        checkpoint.page_listed(start, end, [b.name for b in pending], skipped)
+        yield from pending
+        start = end
+    checkpoint.listing_finished()
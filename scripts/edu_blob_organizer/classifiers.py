@@ -1,5 +1,18 @@
+import itertools
+import os
 import re
-from typing import Dict, Optional
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pdf_preview import PDFParser, pdf_preview
 
 DOC_TYPES = [
     "guideline",
@@ -46,157 +59,251 @@ SOURCE_ORGS = [
 ]
 
 FILENAME_YEAR_RE = re.compile(r"(?P<year>20\d{2}|19\d{2})")
+# In extracted text a year must stand alone, not be part of a longer number
+TEXT_YEAR_RE = re.compile(r"(?<!\d)(?P<year>20\d{2}|19\d{2})(?!\d)")
+# PDF dates look like D:20190312094500+01'00'
+PDF_DATE_RE = re.compile(r"^(?:D:)?(?P<year>20\d{2}|19\d{2})")
+
+
+class KeywordRules:
+    """
+    Ordered keyword rules, built once at import.
+    match() returns the outcome of the first rule, in list order, that has a
+    keyword anywhere in the text, as testing each rule in turn with
+    ``any(k in text for k in keywords)`` would.
+    """
+
+    def __init__(self, rules: List[Tuple[List[str], Any]]):
+        # Flattened to (keyword, outcome) pairs in rule order; a keyword that
+        # an earlier rule already lists can never decide the outcome
+        pairs: Dict[str, Any] = {}
+        for keywords, outcome in rules:
+            for keyword in keywords:
+                pairs.setdefault(keyword, outcome)
+        self.pairs = tuple(pairs.items())
+
+    def match(self, text: str) -> Any:
+        # Plain substring tests: for filename-length text they beat one
+        # combined lookahead regex or a pure-Python automaton in CPython
+        for keyword, outcome in self.pairs:
+            if keyword in text:
+                return outcome
+        return None
+
+
+# (keywords, (docType, evidence_level, source_org)) in precedence order
+DOC_TYPE_RULES = KeywordRules(
+    [
+        (["guideline", "guidelines"], ("guideline", "guideline", "")),
+        (["slide", "deck", "ppt", "keynote"], ("slide_deck", "", "")),
+        (
+            ["textbook", "chapter", "goldman", "cecil"],
+            ("textbook_chapter", "", "Goldman-Cecil"),
+        ),
+        (["rct", "randomized", "randomised", "trial"], ("article_RCT", "RCT", "")),
+        (
+            ["review", "meta-analysis", "metaanalysis", "systematic"],
+            ("review", "review", ""),
+        ),
+        (["protocol", "handout", "workflow", "pathway"], ("protocol_handout", "", "")),
+        (["calc", "calculator", "score"], ("calculator", "", "")),
+        (["figure", "image", "jpg", "jpeg", "png", "svg"], ("image_figure", "", "")),
+        (["notes", "note", "md", "txt"], ("notes", "", "")),
+        (["dataset", "csv", "xlsx", "jsonl", "parquet"], ("dataset", "", "")),
+        (
+            ["snapshot", "website", "web", "archive", "mhtml"],
+            ("website_snapshot", "", ""),
+        ),
+    ]
+)
+
+# Condition names first, then the synonym fallbacks
+CONDITION_RULES = KeywordRules(
+    [([cond.lower()], cond) for cond in CONDITIONS]
+    + [
+        (["stemi", "st elevation"], "STEMI"),
+        (["nstemi"], "NSTEMI"),
+        (["omi"], "OMI"),
+        (["acs", "acute coronary"], "ACS"),
+        (["af", "atrial fibrillation"], "AF"),
+        (["hf", "heart failure"], "HF"),
+        (["hcm"], "HCM"),
+        (["valv", "valve"], "valvular"),
+        (["pericard"], "pericarditis"),
+        (["syncope"], "syncope"),
+        (["hypertension", "htn"], "hypertension"),
+        (["pad", "peripheral artery"], "PAD"),
+        (["ep", "electrophysiol"], "EP"),
+        (["congenital"], "congenital"),
+    ]
+)
+
+# Org names, matched against the filename with dashes removed
+SOURCE_ORG_RULES = KeywordRules(
+    [([org.lower().replace("-", "")], org) for org in SOURCE_ORGS]
+)
+
+SOURCE_ORG_FALLBACK_RULES = KeywordRules(
+    [
+        (["acc", "american college of cardiology"], "ACC"),
+        (["aha", "american heart association"], "AHA"),
+        (["esc", "european society of cardiology"], "ESC"),
+        (["nejm"], "NEJM"),
+        (["jama"], "JAMA"),
+        (["lancet"], "Lancet"),
+        (["cis", "clinical information system"], "CIS"),
+    ]
+)
+
+# Full names only for PDF titles and page text: short acronyms such as "acc"
+# or "esc" occur inside ordinary words there
+CONTENT_SOURCE_ORG_RULES = KeywordRules(
+    [
+        (["american college of cardiology"], "ACC"),
+        (["american heart association"], "AHA"),
+        (["european society of cardiology"], "ESC"),
+        (["new england journal of medicine", "n engl j med"], "NEJM"),
+        (["journal of the american medical association", "jama"], "JAMA"),
+        (["the lancet"], "Lancet"),
+        (["goldman-cecil", "goldman's cecil"], "Goldman-Cecil"),
+    ]
+)
+
+
+# Never previewed as text: their bytes hold no plain-text year. PDFs have
+# their text layer read by pdf_preview instead. Checked before any request.
+BINARY_EXTENSIONS = frozenset(
+    {
+        ".pdf",
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".bmp",
+        ".tif",
+        ".tiff",
+        ".webp",
+        ".heic",
+        ".dcm",
+        ".doc",
+        ".docx",
+        ".ppt",
+        ".pptx",
+        ".xls",
+        ".xlsx",
+        ".key",
+        ".zip",
+        ".gz",
+        ".7z",
+        ".parquet",
+        ".mp3",
+        ".wav",
+        ".mp4",
+        ".mov",
+        ".avi",
+    }
+)
+BINARY_CONTENT_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/msword",
+    "application/vnd.ms-",
+    "application/vnd.openxmlformats-officedocument.",
+)
+# Text-based image format; it can carry a year in its markup
+TEXT_CONTENT_TYPES = ("image/svg+xml",)
+
+# The preview reads the first PREVIEW_FIRST_BYTES and, while no year has been
+# found, ranges PREVIEW_GROWTH times larger, up to PREVIEW_MAX_BYTES in total
+PREVIEW_FIRST_BYTES = 4096
+PREVIEW_GROWTH = 4
+PREVIEW_MAX_BYTES = 200_000
+
+
+def _is_binary(name: str, content_type: Optional[str]) -> bool:
+    extension = os.path.splitext(name)[1].lower()
+    if extension in BINARY_EXTENSIONS:
+        return True
+    content_type = (content_type or "").lower()
+    if content_type.startswith(TEXT_CONTENT_TYPES):
+        return False
+    return content_type.startswith(BINARY_CONTENT_TYPES)
+
+
+def _is_pdf(name: str, content_type: Optional[str]) -> bool:
+    return name.lower().endswith(".pdf") or (content_type or "").lower().startswith(
+        "application/pdf"
+    )
 
 
-def _safe_text_preview(
-    blob_client, container: str, name: str, max_bytes: int = 200_000
+def _preview_year(
+    blob_client,
+    container: str,
+    name: str,
+    content_type: Optional[str] = None,
+    max_bytes: int = PREVIEW_MAX_BYTES,
 ) -> str:
+    """First year in the blob's leading bytes, read in growing ranges; "" if none"""
+    if _is_binary(name, content_type):
+        return ""
     try:
-        downloader = blob_client.get_blob_client(
-            container=container, blob=name
-        ).download_blob(max_bytes=max_bytes)
-        data = downloader.readall()
-        # Very naive: if looks like text, decode; else empty
-        if data.startswith(b"%PDF"):
-            return ""  # we'll prefer optional OCR/Doc Intelligence
-        try:
-            return data.decode("utf-8", errors="ignore")
-        except Exception:
-            return ""
+        blob = blob_client.get_blob_client(container=container, blob=name)
+        data = b""
+        length = PREVIEW_FIRST_BYTES
+        while len(data) < max_bytes:
+            length = min(length, max_bytes - len(data))
+            chunk = blob.download_blob(offset=len(data), length=length).readall()
+            if not data and chunk.startswith(b"%PDF"):
+                return ""  # we'll prefer optional OCR/Doc Intelligence
+            # Start a few bytes back so a year split across ranges is found
+            searched = max(0, len(data) - 3)
+            data += chunk
+            m = FILENAME_YEAR_RE.search(
+                data[searched:].decode("utf-8", errors="ignore")
+            )
+            if m:
+                return m.group("year")
+            if len(chunk) < length:
+                return ""  # end of blob
+            length *= PREVIEW_GROWTH
+        return ""
     except Exception:
+        # Includes reading past the end of a blob whose size is a multiple
+        # of the ranges read so far
         return ""
 
 
-def classify(
-    filename: str,
-    blob_client=None,
-    container: Optional[str] = None,
-    name: Optional[str] = None,
-    use_openai: bool = False,
-    use_docint: bool = False,
-    openai_client=None,
-    docint_client=None,
-) -> Dict[str, str]:
-    """
-    Heuristic classification using filename and (optionally) light content.
-    Conservative defaults + needs_review when confidence is low.
-    """
+def _filename_tags(filename: str) -> Dict[str, str]:
+    """Tags decided by the filename alone; ``year`` is empty if it has none"""
     base = filename.lower()
-    doc_type = ""
-    condition = ""
-    source_org = ""
     year = ""
-    evidence_level = ""
     needs_review = "no"
 
-    # docType heuristics
-    if any(k in base for k in ["guideline", "guidelines"]):
-        doc_type = "guideline"
-        evidence_level = "guideline"
-    elif any(k in base for k in ["slide", "deck", "ppt", "keynote"]):
-        doc_type = "slide_deck"
-    elif any(k in base for k in ["textbook", "chapter", "goldman", "cecil"]):
-        doc_type = "textbook_chapter"
-        source_org = "Goldman-Cecil"
-    elif any(k in base for k in ["rct", "randomized", "randomised", "trial"]):
-        doc_type = "article_RCT"
-        evidence_level = "RCT"
-    elif any(
-        k in base for k in ["review", "meta-analysis", "metaanalysis", "systematic"]
-    ):
-        doc_type = "review"
-        evidence_level = "review"
-    elif any(k in base for k in ["protocol", "handout", "workflow", "pathway"]):
-        doc_type = "protocol_handout"
-    elif any(k in base for k in ["calc", "calculator", "score"]):
-        doc_type = "calculator"
-    elif any(k in base for k in ["figure", "image", "jpg", "jpeg", "png", "svg"]):
-        doc_type = "image_figure"
-    elif any(k in base for k in ["notes", "note", "md", "txt"]):
-        doc_type = "notes"
-    elif any(k in base for k in ["dataset", "csv", "xlsx", "jsonl", "parquet"]):
-        doc_type = "dataset"
-    elif any(k in base for k in ["snapshot", "website", "web", "archive", "mhtml"]):
-        doc_type = "website_snapshot"
-
-    # condition heuristics
-    for cond in CONDITIONS:
-        if cond.lower() in base:
-            condition = cond
-            break
-    if not condition:
-        if any(k in base for k in ["stemi", "st elevation"]):
-            condition = "STEMI"
-        elif any(k in base for k in ["nstemi"]):
-            condition = "NSTEMI"
-        elif any(k in base for k in ["omi"]):
-            condition = "OMI"
-        elif any(k in base for k in ["acs", "acute coronary"]):
-            condition = "ACS"
-        elif any(k in base for k in ["af", "atrial fibrillation"]):
-            condition = "AF"
-        elif any(k in base for k in ["hf", "heart failure"]):
-            condition = "HF"
-        elif any(k in base for k in ["hcm"]):
-            condition = "HCM"
-        elif any(k in base for k in ["valv", "valve"]):
-            condition = "valvular"
-        elif any(k in base for k in ["pericard"]):
-            condition = "pericarditis"
-        elif any(k in base for k in ["syncope"]):
-            condition = "syncope"
-        elif any(k in base for k in ["hypertension", "htn"]):
-            condition = "hypertension"
-        elif any(k in base for k in ["pad", "peripheral artery"]):
-            condition = "PAD"
-        elif any(k in base for k in ["ep", "electrophysiol"]):
-            condition = "EP"
-        elif any(k in base for k in ["congenital"]):
-            condition = "congenital"
-        else:
-            condition = "cardiology_general"
-
-    # source_org
-    for org in SOURCE_ORGS:
-        if org.lower().replace("-", "") in base.replace("-", ""):
-            source_org = org
-            break
-    if not source_org:
-        if any(k in base for k in ["acc", "american college of cardiology"]):
-            source_org = "ACC"
-        elif any(k in base for k in ["aha", "american heart association"]):
-            source_org = "AHA"
-        elif any(k in base for k in ["esc", "european society of cardiology"]):
-            source_org = "ESC"
-        elif any(k in base for k in ["nejm"]):
-            source_org = "NEJM"
-        elif any(k in base for k in ["jama"]):
-            source_org = "JAMA"
-        elif any(k in base for k in ["lancet"]):
-            source_org = "Lancet"
-        elif any(k in base for k in ["cis", "clinical information system"]):
-            source_org = "CIS"
-        else:
-            source_org = "internal"
+    doc_type, evidence_level, source_org = DOC_TYPE_RULES.match(base) or ("", "", "")
+    condition = CONDITION_RULES.match(base) or "cardiology_general"
+    # A listed org overrides the textbook default; the fallback keywords only
+    # apply when neither found anything
+    source_org = (
+        SOURCE_ORG_RULES.match(base.replace("-", ""))
+        or source_org
+        or SOURCE_ORG_FALLBACK_RULES.match(base)
+        or "internal"
+    )
 
     # year
     m = FILENAME_YEAR_RE.search(filename)
     if m:
         year = m.group("year")
 
-    # Optional lightweight content peek
-    if not year and blob_client and container and name:
-        preview = _safe_text_preview(blob_client, container, name)
-        m2 = FILENAME_YEAR_RE.search(preview)
-        if m2:
-            year = m2.group("year")
-
     # sanity defaults
     if not doc_type:
         needs_review = "yes"
         doc_type = "notes"  # conservative bucket
-    if not year:
-        year = "unknown"
 
     return {
         "docType": doc_type,
@@ -209,3 +316,174 @@ def classify(
         "phi": "no",
         "needs_review": needs_review,
     }
+
+
+def _org_from_filename(tags: Dict[str, str], name: str) -> bool:
+    # "internal" is also the default when the filename names no org
+    return tags["source_org"] != "internal" or "internal" in _basename(
+        name
+    ).lower().replace("-", "")
+
+
+def _needs_peek(tags: Dict[str, str], name: str, content_type: Optional[str]) -> bool:
+    if tags["year"]:
+        # PDFs are still read for an org their filename does not name
+        return (
+            PDFParser is not None
+            and _is_pdf(name, content_type)
+            and not _org_from_filename(tags, name)
+        )
+    return True
+
+
+def _peek_pdf(tags: Dict[str, str], blob_client, container: str, name: str):
+    try:
+        preview = pdf_preview(
+            blob_client.get_blob_client(container=container, blob=name)
+        )
+    except Exception:
+        return
+    if not preview:
+        return
+    if not tags["year"]:
+        # Title, then the first pages, then when the file was made
+        m = (
+            TEXT_YEAR_RE.search(preview["title"])
+            or TEXT_YEAR_RE.search(preview["text"])
+            or PDF_DATE_RE.search(preview["created"])
+        )
+        if m:
+            tags["year"] = m.group("year")
+    if not _org_from_filename(tags, name):
+        org = CONTENT_SOURCE_ORG_RULES.match(
+            f"{preview['title']}\n{preview['text']}".lower()
+        )
+        if org:
+            tags["source_org"] = org
+
+
+def _peek_content(
+    tags: Dict[str, str],
+    blob_client,
+    container: str,
+    name: str,
+    content_type: Optional[str] = None,
+):
+    # Optional lightweight content peek
+    if _is_pdf(name, content_type):
+        _peek_pdf(tags, blob_client, container, name)
+        return
+    year = _preview_year(blob_client, container, name, content_type)
+    if year:
+        tags["year"] = year
+
+
+def _year_default(tags: Dict[str, str]) -> Dict[str, str]:
+    if not tags["year"]:
+        tags["year"] = "unknown"
+    return tags
+
+
+def classify(
+    filename: str,
+    blob_client=None,
+    container: Optional[str] = None,
+    name: Optional[str] = None,
+    use_openai: bool = False,
+    use_docint: bool = False,
+    openai_client=None,
+    docint_client=None,
+    content_type: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Heuristic classification using filename and (optionally) light content.
+    Conservative defaults + needs_review when confidence is low.
+    ``content_type`` (from the blob listing) lets binary blobs skip the peek.
+    PDFs are peeked at through their text layer and info dictionary, for the
+    year and for a source org the filename does not name.
+    """
+    tags = _filename_tags(filename)
+    if blob_client and container and name and _needs_peek(tags, name, content_type):
+        _peek_content(tags, blob_client, container, name, content_type)
+    return _year_default(tags)
+
+
+def _basename(name: str) -> str:
+    return name.split("/")[-1]
+
+
+def _classify_chunk(names: List[str]) -> List[Dict[str, str]]:
+    # Module-level so process pool workers can run it; only the tags are sent
+    # back, the parent still holds the names
+    return [_filename_tags(_basename(name)) for name in names]
+
+
+def _filename_phase(
+    names: Iterable[str], processes: int, chunk_size: int
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    if processes <= 1:
+        for name in names:
+            yield name, _filename_tags(_basename(name))
+        return
+    chunks = iter(lambda: list(itertools.islice(names, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # A couple of chunks per process in flight keeps the pool busy without
+        # reading the whole input ahead; results come back in input order
+        in_flight: Deque[Tuple[List[str], Future]] = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(_classify_chunk, chunk)))
+            if len(in_flight) >= 2 * processes:
+                chunk, future = in_flight.popleft()
+                yield from zip(chunk, future.result())
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield from zip(chunk, future.result())
+
+
+def classify_many(
+    names: Iterable[str],
+    blob_client=None,
+    container: Optional[str] = None,
+    processes: int = 1,
+    chunk_size: int = 10_000,
+    peek_workers: int = 8,
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Classify many blob names (or bare filenames), yielding (name, tags) pairs.
+    Same tags as classify() per item. The filename rules run first, in this
+    process or sharded across ``processes`` worker processes in chunks. Items
+    classify() would peek at (no year in the filename, or a PDF whose filename
+    names no org) are peeked at on a pool of ``peek_workers``
+    threads when a blob client and container are given, so downloads never
+    hold up the filename phase. Items without a peek come out in input order;
+    peeked items follow as their downloads finish.
+    """
+    names = iter(names)
+    if not (blob_client and container):
+        for name, tags in _filename_phase(names, processes, chunk_size):
+            yield name, _year_default(tags)
+        return
+
+    def peek(name: str, tags: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+        _peek_content(tags, blob_client, container, name)
+        return name, _year_default(tags)
+
+    # Bounded so a slow container cannot queue the whole input in memory
+    max_pending = 4 * peek_workers
+    pending: Set[Future] = set()
+    peeks = ThreadPoolExecutor(max_workers=peek_workers)
+    try:
+        for name, tags in _filename_phase(names, processes, chunk_size):
+            if _needs_peek(tags, name, None):
+                pending.add(peeks.submit(peek, name, tags))
+            else:
+                yield name, _year_default(tags)
+            if pending:
+                timeout = None if len(pending) >= max_pending else 0
+                done, pending = wait(pending, timeout, FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+    finally:
+        peeks.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import classifiers
+import pdf_preview
+
+# Entries are committed in batches; a crash loses at most this many
+COMMIT_EVERY = 200
+
+
+def rules_version(**options) -> str:
+    """
+    Version of the classification rules: a hash of the classifier sources and
+    of ``options`` (e.g. which optional providers are on). Editing a rule table
+    or the content peek changes it, and every cached entry stops matching.
+    """
+    digest = hashlib.sha256()
+    for module in (classifiers, pdf_preview):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def blob_fingerprint(b) -> Optional[str]:
+    """Content identity of a listed blob: its Content-MD5, else its ETag
+
+    The content type is included since it decides whether content is read.
+    """
+    settings = b.content_settings
+    md5 = settings.content_md5
+    if md5:
+        identity = f"md5:{bytes(md5).hex()}"
+    elif b.etag:
+        identity = "etag:" + b.etag.strip('"')
+    else:
+        return None
+    return f"{identity};{settings.content_type or ''}"
+
+
+class ClassificationCache:
+    """
+    Tags of classified blobs, kept in SQLite across runs.
+    An entry is used only while the blob's fingerprint and the rules version
+    both match; otherwise the blob is classified again and its entry replaced,
+    so there is one row per blob. Thread-safe; shared by the organizer's workers.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            " container TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " rules_version TEXT NOT NULL,"
+            " tags_json TEXT NOT NULL,"
+            " updated TEXT NOT NULL,"
+            " PRIMARY KEY (container, name))"
+        )
+        self._db.commit()
+
+    def get(
+        self, container: str, name: str, fingerprint: str
+    ) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tags_json FROM classifications"
+                " WHERE container = ? AND name = ? AND fingerprint = ?"
+                " AND rules_version = ?",
+                (container, name, fingerprint, self.version),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, container: str, name: str, fingerprint: str, tags: Dict[str, str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    container,
+                    name,
+                    fingerprint,
+                    self.version,
+                    json.dumps(tags, ensure_ascii=False),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            self._unsaved += 1
+            if self._unsaved >= COMMIT_EVERY:
+                self._db.commit()
+                self._unsaved = 0
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,84 @@
+# Document Intelligence client whose submissions and polling go through the
+# OCR service's retry, circuit-breaker and rate-limit guard (azure_resilience.py
+# at the repository root), with the same AZURE_* settings
+import os
+import sys
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from azure_resilience import AzureCallGuard  # noqa: E402
+
+
+class GuardedPoller:
+    """Analyze poller whose polling runs under the guard too
+
+    A poller that failed only re-raises its error, so a retry resumes the
+    operation from its continuation token with a fresh poller instead.
+    """
+
+    def __init__(self, poller, resume: Callable[[str], Any], guard: AzureCallGuard):
+        self._poller = poller
+        self._resume = resume
+        self._token = poller.continuation_token()
+        self.guard = guard
+
+    def result(self, timeout: Optional[float] = None):
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            if attempts:
+                self._poller = self._resume(self._token)
+            attempts += 1
+            return self._poller.result(timeout)
+
+        return self.guard.call(attempt)
+
+    def __getattr__(self, name: str):
+        return getattr(self._poller, name)
+
+
+class GuardedDocumentClient:
+    """Sync DocumentAnalysisClient whose analyze calls use a guard
+
+    The client is expected to have SDK retries off (retry_total=0) so attempts
+    do not multiply; the guard retries both the submission and the polling.
+    Retries rewind a seekable ``document`` to where the first attempt started.
+    Other attributes pass through to the wrapped client.
+    """
+
+    def __init__(self, client, guard: AzureCallGuard):
+        self._client = client
+        self.guard = guard
+
+    def _submit(self, method, model_id, document, **kwargs):
+        start = document.tell() if hasattr(document, "seek") else None
+
+        def attempt():
+            if start is not None:
+                document.seek(start)
+            return method(model_id, document, **kwargs)
+
+        poller = self.guard.call(attempt)
+        return GuardedPoller(
+            poller,
+            lambda token: method(None, None, continuation_token=token, **kwargs),
+            self.guard,
+        )
+
+    def begin_analyze_document(self, model_id, document, **kwargs):
+        return self._submit(
+            self._client.begin_analyze_document, model_id, document, **kwargs
+        )
+
+    def begin_analyze_document_from_url(self, model_id, document_url, **kwargs):
+        return self._submit(
+            self._client.begin_analyze_document_from_url,
+            model_id,
+            document_url,
+            **kwargs,
+        )
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
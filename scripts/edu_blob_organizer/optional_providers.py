@@ -1,6 +1,8 @@
 import os
 from typing import Optional
 
+from docint_guard import AzureCallGuard, GuardedDocumentClient
+
 # Optional providers for smarter classification
 
 try:
@@ -15,6 +17,9 @@ except Exception:
     DocumentAnalysisClient = None
     AzureKeyCredential = None
 
+# One guard per process so every blob shares the breaker and token bucket
+_docint_guard = AzureCallGuard.from_env()
+
 
 def get_openai_client() -> Optional[object]:
     if OpenAI is None:
@@ -34,4 +39,9 @@ def get_docint_client() -> Optional[object]:
     key = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
     if not (endpoint and key):
         return None
-    return DocumentAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+    # Retries are left to the guard, which covers submission and polling, so
+    # attempts do not multiply
+    client = DocumentAnalysisClient(
+        endpoint=endpoint, credential=AzureKeyCredential(key), retry_total=0
+    )
+    return GuardedDocumentClient(client, _docint_guard)
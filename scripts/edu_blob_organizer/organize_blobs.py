@@ -2,6 +2,7 @@
 import csv
 import argparse
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Optional, Tuple, Any
 from datetime import datetime, timezone
 
@@ -10,7 +11,9 @@ from azure.storage.blob import BlobServiceClient
 from azure.storage.blob import BlobClient
 
 from azure_clients import get_blob_and_adls_clients, is_hns_enabled
+from checkpoint import RunCheckpoint, iter_blobs
 from classifiers import classify
+from classify_cache import ClassificationCache, blob_fingerprint, rules_version
 from optional_providers import get_openai_client, get_docint_client
 
 try:
@@ -120,6 +123,31 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         default=None,
         help="Process at most N files (useful for cautious first runs)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Blobs to classify and move in parallel (default 1)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint, skipping finished blobs",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint file (default: <audit-log>.checkpoint.json)",
+    )
+    parser.add_argument(
+        "--cache",
+        default="education_classify_cache.sqlite",
+        help="SQLite file of tags from earlier runs; unchanged blobs are not "
+        "classified again (default education_classify_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Classify every blob afresh"
+    )
     return parser
 
 
@@ -145,6 +173,7 @@ def _print_banner(container: str, prefix: str, hns: bool, use_adls: bool, args):
     print(f"[INFO] Tag only: {args.tag_only}")
     if args.max_files:
         print(f"[INFO] Max files: {args.max_files}")
+    print(f"[INFO] Workers: {args.workers}")
     print("[INFO] Scanning blobs...")
 
 
@@ -195,24 +224,29 @@ def _process_blob(
     blob_service: BlobServiceClient,
     adls_client: Optional[Any],
     use_adls: bool,
-    writer: csv.DictWriter,
-):
-    # Skip virtual directories
-    if b.name.endswith("/"):
-        return False
-
+    openai_client: Optional[object],
+    docint_client: Optional[object],
+    cache: Optional[ClassificationCache],
+) -> Dict[str, str]:
     filename = b.name.split("/")[-1]
 
-    tags = classify(
-        filename=filename,
-        blob_client=blob_service,
-        container=args.container,
-        name=b.name,
-        use_openai=bool(get_openai_client() if args.use_openai else None),
-        use_docint=bool(get_docint_client() if args.use_docint else None),
-        openai_client=get_openai_client() if args.use_openai else None,
-        docint_client=get_docint_client() if args.use_docint else None,
-    )
+    # Unchanged blobs reuse their tags: no content download or provider calls
+    fingerprint = blob_fingerprint(b) if cache else None
+    tags = cache.get(args.container, b.name, fingerprint) if fingerprint else None
+    if tags is None:
+        tags = classify(
+            filename=filename,
+            blob_client=blob_service,
+            container=args.container,
+            name=b.name,
+            use_openai=bool(openai_client),
+            use_docint=bool(docint_client),
+            openai_client=openai_client,
+            docint_client=docint_client,
+            content_type=b.content_settings.content_type,
+        )
+        if fingerprint:
+            cache.put(args.container, b.name, fingerprint, tags)
     dst = detect_destination_path(tags, filename)
     action = _determine_action(args.dry_run, args.tag_only, use_adls)
 
@@ -229,24 +263,38 @@ def _process_blob(
         overwrite=args.overwrite,
     )
 
-    writer.writerow(
-        {
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "source_path": b.name,
+        "destination_path": dst,
+        "action": action,
+        "status": "ok",
+        "error": "",
+        "tags_json": json.dumps(tags, ensure_ascii=False),
+    }
+
+
+def _process_blob_isolated(b, *process_args) -> Dict[str, str]:
+    # A failing blob becomes an error row; it never stops the run
+    try:
+        return _process_blob(b, *process_args)
+    except Exception as e:
+        return {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "source_path": b.name,
-            "destination_path": dst,
-            "action": action,
-            "status": "ok",
-            "error": "",
-            "tags_json": json.dumps(tags, ensure_ascii=False),
+            "destination_path": "",
+            "action": "skip",
+            "status": "error",
+            "error": str(e),
+            "tags_json": "{}",
         }
-    )
-    print(f"[OK] {b.name} -> {dst} :: {tags}")
-    return True
 
 
 def main():
     parser = _build_arg_parser()
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
 
     blob_service, adls_client, hns = _init_clients(args)
     use_adls = args.use_adls or hns
@@ -256,6 +304,46 @@ def main():
 
     _print_banner(container, prefix, hns, use_adls, args)
 
+    checkpoint_path = args.checkpoint or f"{args.audit_log}.checkpoint.json"
+    if args.dry_run:
+        mode = "dry-run"
+    else:
+        mode = "tag-only" if args.tag_only else "move"
+    if args.resume:
+        try:
+            checkpoint = RunCheckpoint.load(checkpoint_path, container, prefix, mode)
+        except ValueError as e:
+            parser.error(str(e))
+        if checkpoint.finished:
+            print(f"[INFO] Checkpoint {checkpoint_path} is complete; nothing to resume")
+            return
+        if checkpoint.resumed:
+            print(f"[INFO] Resuming from checkpoint {checkpoint_path}")
+        else:
+            print(
+                f"[INFO] No checkpoint at {checkpoint_path}; starting from the beginning"
+            )
+    else:
+        checkpoint = RunCheckpoint(checkpoint_path, container, prefix, mode)
+
+    # Optional providers are created once and shared by all workers
+    openai_client = get_openai_client() if args.use_openai else None
+    docint_client = get_docint_client() if args.use_docint else None
+    cache = None
+    if not args.no_cache:
+        version = rules_version(openai=bool(openai_client), docint=bool(docint_client))
+        cache = ClassificationCache(args.cache, version)
+        print(f"[INFO] Classification cache: {args.cache} (rules {version})")
+    process_args = (
+        args,
+        blob_service,
+        adls_client,
+        use_adls,
+        openai_client,
+        docint_client,
+        cache,
+    )
+
     # Open CSV audit
     fieldnames = [
         "timestamp",
@@ -266,46 +354,77 @@ def main():
         "error",
         "tags_json",
     ]
-    with open(args.audit_log, "w", newline="", encoding="utf-8") as fcsv:
+    # Appended to, so earlier runs and interrupted ones keep their rows
+    with open(args.audit_log, "a", newline="", encoding="utf-8") as fcsv:
         writer = csv.DictWriter(fcsv, fieldnames=fieldnames)
-        writer.writeheader()
+        if fcsv.tell() == 0:
+            writer.writeheader()
+
+        def record(row: Dict[str, str]):
+            writer.writerow(row)
+            # Failed blobs stay pending so --resume retries them. The row is
+            # on disk before the checkpoint can count the blob done.
+            if row["status"] == "ok":
+                checkpoint.mark_done(row["source_path"])
+            fcsv.flush()
+            checkpoint.save_periodically()
 
         container_client = blob_service.get_container_client(container)
-        blobs = container_client.list_blobs(name_starts_with=prefix)
+        blobs = iter_blobs(container_client, prefix, checkpoint)
 
+        # Listing runs here while workers classify and move; only this thread
+        # writes the audit CSV. At most two blobs per worker are in flight, and
+        # never more than could still succeed under --max-files, so the limit
+        # holds exactly and failed blobs make room for further ones.
+        window = 2 * args.workers
         processed = 0
-        for b in blobs:
-            try:
-                did = _process_blob(
-                    b,
-                    args,
-                    blob_service,
-                    adls_client,
-                    use_adls,
-                    writer,
-                )
-
-                if did:
-                    processed += 1
-                if args.max_files and processed >= args.max_files:
-                    print(
-                        f"[INFO] Reached max-files limit ({args.max_files}). Stopping."
-                    )
+        listed_all = False
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+        try:
+            while True:
+                while not listed_all and len(pending) < window:
+                    if args.max_files and processed + len(pending) >= args.max_files:
+                        break
+                    b = next(blobs, None)
+                    if b is None:
+                        listed_all = True
+                    else:
+                        future = pool.submit(_process_blob_isolated, b, *process_args)
+                        pending[future] = b
+                if not pending:
                     break
 
-            except Exception as e:
-                writer.writerow(
-                    {
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "source_path": b.name,
-                        "destination_path": "",
-                        "action": "skip",
-                        "status": "error",
-                        "error": str(e),
-                        "tags_json": "{}",
-                    }
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    b = pending.pop(future)
+                    row = future.result()
+                    record(row)
+                    if row["status"] == "ok":
+                        processed += 1
+                        print(
+                            f"[OK] {b.name} -> {row['destination_path']} :: {row['tags_json']}"
+                        )
+                    else:
+                        print(f"[ERR] {b.name}: {row['error']}")
+
+            if args.max_files and processed >= args.max_files:
+                print(f"[INFO] Reached max-files limit ({args.max_files}). Stopping.")
+        finally:
+            # On Ctrl-C, drop queued blobs and let running ones finish
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Blobs that finished while stopping still get their audit row
+            for future in pending:
+                if future.done() and not future.cancelled():
+                    record(future.result())
+            fcsv.flush()
+            checkpoint.save()
+            if cache:
+                cache.close()
+                print(
+                    f"[INFO] Classification cache: {cache.hits} reused, "
+                    f"{cache.misses} classified"
                 )
-                print(f"[ERR] {b.name}: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+import io
+import itertools
+import re
+from typing import Dict, Optional
+
+# Optional: pdfminer.six reads the PDF's text layer
+try:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import PDFObjRef, resolve1
+    from pdfminer.utils import decode_text
+except Exception:
+    PDFParser = None
+
+# Blobs are read in PDF_BLOCK_BYTES ranges as the parser asks for them; a
+# preview stops once PDF_MAX_BYTES have been downloaded
+PDF_BLOCK_BYTES = 16 * 1024
+PDF_MAX_BYTES = 4_000_000
+PDF_MAX_PAGES = 2
+# Bytes read at an XObject's offset to see whether it is an image
+XOBJECT_HEAD_BYTES = 512
+
+IMAGE_SUBTYPE_RE = re.compile(rb"/Subtype\s*/Image\b")
+
+
+class ReadLimitExceeded(Exception):
+    pass
+
+
+class RangedBlobReader(io.RawIOBase):
+    """
+    Seekable, read-only file over a blob, downloaded in ranges on demand.
+    pdfminer reads the trailer and cross-reference table at the end of the
+    file, then seeks to the objects it needs, so only those ranges are fetched.
+    Ranges are cached; reading more than ``max_bytes`` raises ReadLimitExceeded.
+    """
+
+    def __init__(
+        self,
+        blob,
+        size: int,
+        block_size: int = PDF_BLOCK_BYTES,
+        max_bytes: int = PDF_MAX_BYTES,
+    ):
+        self._blob = blob
+        self.size = size
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.downloaded = 0
+        self._blocks: Dict[int, bytes] = {}
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def _download(self, offset: int, length: int) -> bytes:
+        if self.downloaded + length > self.max_bytes:
+            raise ReadLimitExceeded(
+                f"PDF preview would read more than {self.max_bytes} bytes"
+            )
+        data = self._blob.download_blob(offset=offset, length=length).readall()
+        self.downloaded += len(data)
+        return data
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is None:
+            offset = index * self.block_size
+            block = self._download(offset, min(self.block_size, self.size - offset))
+            self._blocks[index] = block
+        return block
+
+    def peek_at(self, offset: int, length: int) -> bytes:
+        """Bytes at ``offset``, from the cache or a range of just ``length``"""
+        length = min(length, self.size - offset)
+        index, start = divmod(offset, self.block_size)
+        if index in self._blocks and start + length <= self.block_size:
+            return self._blocks[index][start : start + length]
+        return self._download(offset, length) if length > 0 else b""
+
+    def readinto(self, buffer) -> int:
+        end = min(self._pos + len(buffer), self.size)
+        n = 0
+        while self._pos < end:
+            index, start = divmod(self._pos, self.block_size)
+            chunk = self._block(index)[start : start + end - self._pos]
+            if not chunk:
+                break
+            buffer[n : n + len(chunk)] = chunk
+            n += len(chunk)
+            self._pos += len(chunk)
+        return n
+
+
+def _info_text(info: Dict, key: str) -> str:
+    value = resolve1(info.get(key))
+    if isinstance(value, bytes):
+        return decode_text(value).strip()
+    if isinstance(value, str):
+        return value.strip()
+    return ""
+
+
+def _is_image(document, fp: RangedBlobReader, ref) -> bool:
+    # Judged from the object's dictionary; resolving it would download the
+    # whole image, which text extraction never looks at
+    if not isinstance(ref, PDFObjRef):
+        return False
+    for xref in document.xrefs:
+        try:
+            stream_id, offset, _ = xref.get_pos(ref.objid)
+        except KeyError:
+            continue
+        if stream_id is not None:
+            # Streams never sit inside object streams
+            return False
+        head = fp.peek_at(offset, XOBJECT_HEAD_BYTES).split(b"stream", 1)[0]
+        return bool(IMAGE_SUBTYPE_RE.search(head))
+    return False
+
+
+def _text_resources(document, fp: RangedBlobReader, page):
+    """
+    Trim what pdfminer would download without needing it for text: image
+    XObjects, and embedded font programs of fonts that map to Unicode through
+    a ToUnicode CMap. Images inside form XObjects are still read.
+    """
+    resources = page.resources
+    xobjects = resolve1(resources.get("XObject"))
+    if isinstance(xobjects, dict):
+        kept = {
+            key: ref
+            for key, ref in xobjects.items()
+            if not _is_image(document, fp, ref)
+        }
+        page.resources = resources = dict(resources, XObject=kept)
+    fonts = resolve1(resources.get("Font"))
+    for spec in fonts.values() if isinstance(fonts, dict) else ():
+        spec = resolve1(spec)
+        if not isinstance(spec, dict) or "ToUnicode" not in spec:
+            continue
+        descendants = resolve1(spec.get("DescendantFonts")) or []
+        for font in [spec] + [resolve1(d) for d in descendants]:
+            descriptor = resolve1(font.get("FontDescriptor"))
+            if isinstance(descriptor, dict):
+                # The resolved dictionary is cached, so pdfminer sees this
+                descriptor.pop("FontFile", None)
+                descriptor.pop("FontFile2", None)
+
+
+def pdf_preview(
+    blob, max_pages: int = PDF_MAX_PAGES, max_bytes: int = PDF_MAX_BYTES
+) -> Optional[Dict[str, str]]:
+    """
+    Title, CreationDate and text of the first ``max_pages`` pages of a PDF blob.
+    Returns {"title", "created", "text"} with empty strings for what the PDF
+    does not have (scanned pages have no text layer), or None if pdfminer is
+    not installed or the file cannot be parsed within ``max_bytes``.
+    """
+    if PDFParser is None:
+        return None
+    fp = RangedBlobReader(blob, blob.get_blob_properties().size, max_bytes=max_bytes)
+    try:
+        # Without a usable cross-reference table pdfminer falls back to
+        # scanning the whole file, which the read limit cuts short
+        document = PDFDocument(PDFParser(fp))
+    except Exception:
+        return None
+    preview = {"title": "", "created": "", "text": ""}
+    # The most recent trailer's info dictionary comes first
+    for info in document.info:
+        preview["title"] = preview["title"] or _info_text(info, "Title")
+        preview["created"] = preview["created"] or _info_text(info, "CreationDate")
+
+    text = io.StringIO()
+    resources = PDFResourceManager(caching=True)
+    device = TextConverter(resources, text, laparams=LAParams())
+    interpreter = PDFPageInterpreter(resources, device)
+    try:
+        for page in itertools.islice(PDFPage.create_pages(document), max_pages):
+            _text_resources(document, fp, page)
+            interpreter.process_page(page)
+    except Exception:
+        # Keep the text of the pages read before the limit or a broken page
+        pass
+    finally:
+        device.close()
+    preview["text"] = text.getvalue()
+    return preview
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Azure Form Recognizer REST API
+Answers analyze requests with 202 + Operation-Location and reports the result
+as "running" until the configured latency has passed, so the SDK poller in
+ocr_app.py behaves as it does against Azure without network calls or cost.
+
+Usage:
+    python scripts/ocr_bench/azure_stub.py --port 8765 --latency 2.0
+    FORM_RECOGNIZER_ENDPOINT=http://127.0.0.1:8765/ FORM_RECOGNIZER_KEY=stub \
+        uvicorn ocr_app:app
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from synthetic_corpus import LAB_ROWS, SUMMARY_LINES
+
+API_VERSION = "2023-07-31"
+
+
+def _page(number: int, lines: List[str]) -> Dict[str, Any]:
+    return {
+        "pageNumber": number,
+        "angle": 0,
+        "width": 8.5,
+        "height": 11,
+        "unit": "inch",
+        "words": [
+            {
+                "content": word,
+                "polygon": [1, 1, 2, 1, 2, 1.2, 1, 1.2],
+                "confidence": 0.98,
+                "span": {"offset": 0, "length": len(word)},
+            }
+            for line in lines
+            for word in line.split()
+        ],
+        "lines": [
+            {
+                "content": line,
+                "polygon": [
+                    1,
+                    1 + i * 0.2,
+                    7,
+                    1 + i * 0.2,
+                    7,
+                    1.15 + i * 0.2,
+                    1,
+                    1.15 + i * 0.2,
+                ],
+                "spans": [{"offset": 0, "length": len(line)}],
+            }
+            for i, line in enumerate(lines)
+        ],
+        "spans": [{"offset": 0, "length": sum(len(line) + 1 for line in lines)}],
+    }
+
+
+def _lab_table(page_number: int) -> Dict[str, Any]:
+    header = ["Test", "Result", "Units", "Reference"]
+    cells = [
+        {
+            "kind": "columnHeader",
+            "rowIndex": 0,
+            "columnIndex": c,
+            "content": text,
+            "spans": [],
+        }
+        for c, text in enumerate(header)
+    ]
+    for r, row in enumerate(LAB_ROWS, start=1):
+        cells.extend(
+            {"rowIndex": r, "columnIndex": c, "content": text, "spans": []}
+            for c, text in enumerate(row)
+        )
+    return {
+        "rowCount": len(LAB_ROWS) + 1,
+        "columnCount": len(header),
+        "cells": cells,
+        "boundingRegions": [
+            {"pageNumber": page_number, "polygon": [1, 3, 7, 3, 7, 6, 1, 6]}
+        ],
+        "spans": [],
+    }
+
+
+def _page_numbers(pages: Optional[str], default_pages: int) -> List[int]:
+    """Expand an Azure ``pages`` parameter such as "1-4" or "1,3,5-6" """
+    if not pages:
+        return list(range(1, default_pages + 1))
+    numbers = []
+    for part in pages.split(","):
+        first, _, last = part.partition("-")
+        numbers.extend(range(int(first), int(last or first) + 1))
+    return numbers
+
+
+def analyze_result(model_id: str, page_numbers: List[int]) -> Dict[str, Any]:
+    pages = [
+        _page(n, SUMMARY_LINES if n % 2 else [" ".join(r) for r in LAB_ROWS])
+        for n in page_numbers
+    ]
+    content = "\n".join(line["content"] for page in pages for line in page["lines"])
+    result = {
+        "apiVersion": API_VERSION,
+        "modelId": model_id,
+        "stringIndexType": "textElements",
+        "content": content,
+        "pages": pages,
+    }
+    if model_id == "prebuilt-layout":
+        result["tables"] = [_lab_table(n) for n in page_numbers if n % 2 == 0]
+    return result
+
+
+class AzureStub:
+    """Analyze operations kept in memory until their simulated latency passes"""
+
+    def __init__(
+        self, latency: float, poll_interval: float = 0.25, default_pages: int = 1
+    ):
+        self.latency = latency
+        self.poll_interval = poll_interval
+        self.default_pages = default_pages
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self._ids = itertools.count(1)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024**3)
+        app.router.add_post(
+            "/formrecognizer/documentModels/{model_id:[^/:]+}:analyze", self.analyze
+        )
+        app.router.add_get(
+            "/formrecognizer/documentModels/{model_id}/analyzeResults/{result_id}",
+            self.result,
+        )
+        return app
+
+    async def analyze(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.requests += 1
+        model_id = request.match_info["model_id"]
+        result_id = f"stub-{next(self._ids)}"
+        self.operations[result_id] = {
+            "model_id": model_id,
+            "pages": _page_numbers(request.query.get("pages"), self.default_pages),
+            "ready_at": time.monotonic() + self.latency,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        location = (
+            f"{request.scheme}://{request.host}/formrecognizer/documentModels/"
+            f"{model_id}/analyzeResults/{result_id}?api-version={API_VERSION}"
+        )
+        return web.Response(
+            status=202,
+            headers={
+                "Operation-Location": location,
+                "Retry-After-Ms": str(int(self.poll_interval * 1000)),
+            },
+        )
+
+    async def result(self, request: web.Request) -> web.Response:
+        operation = self.operations.get(request.match_info["result_id"])
+        if operation is None:
+            return web.json_response({"error": {"code": "NotFound"}}, status=404)
+        body = {
+            "createdDateTime": operation["created"],
+            "lastUpdatedDateTime": operation["created"],
+        }
+        if time.monotonic() < operation["ready_at"]:
+            body["status"] = "running"
+            return web.json_response(
+                body,
+                headers={"Retry-After-Ms": str(int(self.poll_interval * 1000))},
+            )
+        self.operations.pop(request.match_info["result_id"])
+        body["status"] = "succeeded"
+        body["analyzeResult"] = analyze_result(
+            operation["model_id"], operation["pages"]
+        )
+        return web.json_response(body)
+
+
+async def start_stub(
+    host: str, port: int, latency: float, poll_interval: float
+) -> web.AppRunner:
+    """Run the stub on the current event loop; returns the runner to clean up"""
+    runner = web.AppRunner(AzureStub(latency, poll_interval).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", type=float, default=2.0, help="Seconds until a result is ready"
+    )
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    async def serve():
+        await start_stub(args.host, args.port, args.latency, args.poll_interval)
+        print(f"[INFO] Azure stub on http://{args.host}:{args.port}/")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the OCR preprocessing pipeline
+Reports per-stage latency and peak traced memory for each synthetic image.
+
+Usage:
+    python scripts/ocr_bench/bench_preprocess.py
+    python scripts/ocr_bench/bench_preprocess.py --repeat 5 --json bench.json
+    python scripts/ocr_bench/bench_preprocess.py --pipeline downscale,deskew,adaptive_threshold
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from ocr_preprocess import STAGES, parse_stages, run_pipeline  # noqa: E402
+from synthetic_corpus import build_corpus  # noqa: E402
+
+DEFAULT_PIPELINES = [
+    "blur,threshold",
+    "downscale,blur,threshold",
+    "downscale,crop_borders,deskew,denoise,adaptive_threshold",
+]
+
+
+def _measure(fn, repeat: int) -> Dict[str, float]:
+    """Median wall time and peak traced allocation over ``repeat`` runs"""
+    times = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "min_ms": round(min(times) * 1000, 2),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def bench_image(image, pipelines: List[str], repeat: int) -> Dict[str, Any]:
+    decoded = {}
+
+    def decode():
+        nparr = np.frombuffer(image.data, np.uint8)
+        decoded["gray"] = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+
+    result: Dict[str, Any] = {
+        "image": image.name,
+        "size": f"{image.width}x{image.height}",
+        "bytes": len(image.data),
+        "decode": _measure(decode, repeat),
+        "stages": {},
+        "pipelines": {},
+    }
+    gray = decoded["gray"]
+
+    # Each stage in isolation on the decoded page
+    for name in STAGES:
+        stage = parse_stages(name)
+        result["stages"][name] = _measure(
+            lambda: run_pipeline(gray, stage, source_dpi=image.dpi), repeat
+        )
+
+    # End-to-end pipelines with the per-stage split from the last run
+    for spec in pipelines:
+        stages = parse_stages(spec)
+        timings: Dict[str, float] = {}
+        stats = _measure(
+            lambda: run_pipeline(gray, stages, source_dpi=image.dpi, timings=timings),
+            repeat,
+        )
+        stats["stage_ms"] = {
+            name: round(seconds / repeat * 1000, 2) for name, seconds in timings.items()
+        }
+        result["pipelines"][spec] = stats
+    return result
+
+
+def _print_table(results: List[Dict[str, Any]]):
+    for res in results:
+        print(f"\n{res['image']} ({res['size']}, {res['bytes'] / 1024:.0f} KiB)")
+        print(f"  {'decode':<58} {res['decode']['median_ms']:>9.2f} ms")
+        for name, stats in res["stages"].items():
+            print(
+                f"  stage {name:<52} {stats['median_ms']:>9.2f} ms"
+                f" {stats['peak_mb']:>8.2f} MB"
+            )
+        for spec, stats in res["pipelines"].items():
+            print(
+                f"  pipeline {spec:<49} {stats['median_ms']:>9.2f} ms"
+                f" {stats['peak_mb']:>8.2f} MB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--pipeline",
+        action="append",
+        dest="pipelines",
+        help="Comma-separated stage list to time end-to-end (repeatable)",
+    )
+    parser.add_argument("--image", action="append", dest="images")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON")
+    args = parser.parse_args()
+
+    corpus = build_corpus(seed=args.seed, names=args.images)
+    pipelines = args.pipelines or DEFAULT_PIPELINES
+    results = [bench_image(image, pipelines, args.repeat) for image in corpus]
+
+    _print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\n[INFO] Wrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Load-generation benchmark for the OCR service
+Replays the synthetic corpus against ocr_app.py at a fixed concurrency and
+reports latency percentiles, throughput and server RSS per endpoint. Azure
+endpoints talk to azure_stub.py, which simulates the analyze poller.
+
+Usage:
+    python scripts/ocr_bench/bench_service.py
+    python scripts/ocr_bench/bench_service.py --concurrency 16 --requests 200 --json run.json
+    python scripts/ocr_bench/bench_service.py --mode uvicorn --workers 4 --baseline main.json
+    python scripts/ocr_bench/bench_service.py --endpoint medical-form --azure-latency 5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from azure_stub import start_stub  # noqa: E402
+from synthetic_corpus import build_corpus, multipage_tiff  # noqa: E402
+
+ENDPOINTS = {
+    "tesseract": "/ocr/tesseract",
+    "azure": "/ocr/azure",
+    "medical-form": "/ocr/medical-form",
+    "batch": "/ocr/batch",
+}
+DEFAULT_ENDPOINTS = ["tesseract", "azure", "medical-form"]
+# Files per /ocr/batch request
+BATCH_SIZE = 4
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process and all its descendants (Linux /proc)"""
+    try:
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; fields follow ")"
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        total = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(children.get(current, []))
+            try:
+                with open(f"/proc/{current}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total += int(line.split()[1]) * 1024
+                            break
+            except OSError:
+                continue
+        return total
+    except OSError:
+        return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class InProcessServer:
+    """ocr_app under uvicorn in a background thread of this process"""
+
+    def __init__(self, port: int, env: Dict[str, str]):
+        self.port = port
+        self.env = env
+        self.pid = os.getpid()
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        import uvicorn
+
+        # Configuration is read from the environment at import time
+        os.environ.update(self.env)
+        import ocr_app
+
+        config = uvicorn.Config(
+            ocr_app.app, host="127.0.0.1", port=self.port, log_level="warning"
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=30)
+
+
+class SubprocessServer:
+    """ocr_app under the uvicorn CLI, optionally with several workers"""
+
+    def __init__(self, port: int, env: Dict[str, str], workers: int):
+        self.port = port
+        self.env = env
+        self.workers = workers
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def pid(self) -> int:
+        return self._process.pid
+
+    def start(self):
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "ocr_app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self.port),
+            "--workers",
+            str(self.workers),
+            "--log-level",
+            "warning",
+        ]
+        self._process = subprocess.Popen(
+            command, cwd=REPO_ROOT, env={**os.environ, **self.env}
+        )
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
+async def wait_ready(session: aiohttp.ClientSession, base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"OCR service did not become healthy within {timeout}s")
+
+
+def build_form(endpoint: str, files: List[Dict[str, Any]], index: int):
+    data = aiohttp.FormData()
+    if endpoint == "batch":
+        for offset in range(BATCH_SIZE):
+            item = files[(index + offset) % len(files)]
+            data.add_field(
+                "files", item["data"], filename=item["name"], content_type=item["type"]
+            )
+    else:
+        item = files[index % len(files)]
+        data.add_field(
+            "file", item["data"], filename=item["name"], content_type=item["type"]
+        )
+    return data
+
+
+async def run_endpoint(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    endpoint: str,
+    files: List[Dict[str, Any]],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    server_pid: int,
+) -> Dict[str, Any]:
+    url = base_url + ENDPOINTS[endpoint]
+
+    async def send(index: int):
+        started = time.perf_counter()
+        try:
+            async with session.post(url, data=build_form(endpoint, files, index)) as r:
+                await r.read()
+                status = r.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        return time.perf_counter() - started, status
+
+    for index in range(warmup):
+        await send(index)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+    rss_samples = [tree_rss_bytes(server_pid)]
+
+    async def worker():
+        for index in counter:
+            latency, status = await send(index)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(latency)
+
+    async def sample_rss(stop: asyncio.Event):
+        while not stop.is_set():
+            rss_samples.append(tree_rss_bytes(server_pid))
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=0.2)
+            except asyncio.TimeoutError:
+                pass
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    stop.set()
+    await sampler
+    rss_samples.append(tree_rss_bytes(server_pid))
+
+    latencies.sort()
+    rss = [sample for sample in rss_samples if sample is not None]
+    mb = 1024 * 1024
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "rss_mb": {
+            "start": round(rss[0] / mb, 1) if rss else None,
+            "peak": round(max(rss) / mb, 1) if rss else None,
+            "end": round(rss[-1] / mb, 1) if rss else None,
+        },
+    }
+
+
+def load_files(seed: int, images: Optional[List[str]], tiff_pages: int):
+    files = []
+    for image in build_corpus(seed=seed, names=images):
+        is_jpeg = image.name.startswith("phone")
+        files.append(
+            {
+                "name": f"{image.name}.{'jpg' if is_jpeg else 'png'}",
+                "data": image.data,
+                "type": "image/jpeg" if is_jpeg else "image/png",
+            }
+        )
+    if tiff_pages:
+        files.append(
+            {
+                "name": f"packet_{tiff_pages}p.tif",
+                "data": multipage_tiff(seed=seed, pages=tiff_pages),
+                "type": "image/tiff",
+            }
+        )
+    return files
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(results: Dict[str, Dict[str, Any]]):
+    print(
+        f"\n{'endpoint':<14} {'ok/req':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9}"
+        f" {'p99 ms':>9} {'peak RSS MB':>12}"
+    )
+    for endpoint, res in results.items():
+        lat = res["latency_ms"]
+        print(
+            f"{endpoint:<14} {res['ok']:>4}/{res['requests']:<4} {res['rps']:>8.2f}"
+            f" {lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f}"
+            f" {res['rss_mb']['peak'] or 0:>12.1f}"
+        )
+        errors = {k: v for k, v in res["statuses"].items() if k != "200"}
+        if errors:
+            print(f"{'':<14} errors: {errors}")
+
+
+def _print_comparison(results: Dict[str, Dict[str, Any]], baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('commit')})")
+    for endpoint, res in results.items():
+        old = baseline.get("results", {}).get(endpoint)
+        if not old:
+            continue
+        changes = []
+        for label, new_value, old_value in (
+            ("rps", res["rps"], old["rps"]),
+            ("p50", res["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+            ("p95", res["latency_ms"]["p95"], old["latency_ms"]["p95"]),
+            ("p99", res["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+        ):
+            if old_value:
+                changes.append(f"{label} {(new_value - old_value) / old_value:+.1%}")
+        print(f"  {endpoint:<14} {'  '.join(changes)}")
+
+
+async def run(args) -> Dict[str, Any]:
+    stub_port = free_port()
+    stub = await start_stub("127.0.0.1", stub_port, args.azure_latency, 0.25)
+    env = {
+        "FORM_RECOGNIZER_ENDPOINT": f"http://127.0.0.1:{stub_port}/",
+        "FORM_RECOGNIZER_KEY": "stub",
+    }
+    if not args.cache:
+        # Repeated corpus files would otherwise measure the result cache
+        env.update({"OCR_CACHE_MAX_BYTES": "0", "OCR_CACHE_DB": ""})
+
+    port = free_port()
+    if args.mode == "uvicorn":
+        server = SubprocessServer(port, env, args.workers)
+    else:
+        server = InProcessServer(port, env)
+    base_url = f"http://127.0.0.1:{port}"
+    files = load_files(args.seed, args.images, args.tiff_pages)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    server.start()
+    try:
+        async with aiohttp.ClientSession(
+            timeout=timeout, connector=connector
+        ) as session:
+            await wait_ready(session, base_url, timeout=60)
+            for endpoint in args.endpoints or DEFAULT_ENDPOINTS:
+                print(f"[INFO] {endpoint}: {args.requests} requests")
+                results[endpoint] = await run_endpoint(
+                    session,
+                    base_url,
+                    endpoint,
+                    files,
+                    args.requests,
+                    args.concurrency,
+                    args.warmup,
+                    server.pid,
+                )
+    finally:
+        server.stop()
+        await stub.cleanup()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "azure_latency_s": args.azure_latency,
+            "cache": args.cache,
+            "seed": args.seed,
+            "files": [f["name"] for f in files],
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers (--mode uvicorn)"
+    )
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        dest="endpoints",
+        choices=list(ENDPOINTS),
+        help="Endpoint to load (repeatable; default tesseract, azure, medical-form)",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="Per endpoint")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument(
+        "--azure-latency",
+        type=float,
+        default=2.0,
+        help="Seconds the Azure stub takes to finish an analysis",
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Leave the result cache enabled"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--image", action="append", dest="images")
+    parser.add_argument(
+        "--tiff-pages",
+        type=int,
+        default=0,
+        help="Also send a multi-page TIFF packet with this many pages",
+    )
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Earlier --json output to compare with")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    _print_table(report["results"])
+    if args.baseline:
+        _print_comparison(report["results"], args.baseline)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[INFO] Wrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
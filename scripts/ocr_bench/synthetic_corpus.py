@@ -0,0 +1,185 @@
+"""
+Synthetic clinical scans for OCR benchmarks
+Images are generated deterministically from a seed so every run (and every
+commit) measures the same inputs without shipping binary fixtures.
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+LAB_ROWS = [
+    ("Troponin I", "0.04", "ng/mL", "<0.04"),
+    ("BNP", "812", "pg/mL", "<100"),
+    ("Potassium", "4.1", "mmol/L", "3.5-5.1"),
+    ("Creatinine", "1.3", "mg/dL", "0.7-1.3"),
+    ("LDL", "142", "mg/dL", "<100"),
+    ("Hemoglobin", "12.8", "g/dL", "13.5-17.5"),
+    ("INR", "2.4", "", "2.0-3.0"),
+    ("Magnesium", "1.9", "mg/dL", "1.7-2.2"),
+]
+
+SUMMARY_LINES = [
+    "DISCHARGE SUMMARY - CARDIOLOGY",
+    "Admitting diagnosis: NSTEMI, HFrEF (EF 35%)",
+    "Procedures: Left heart catheterization, PCI to mid LAD (DES x1)",
+    "Hospital course: Chest pain resolved after revascularization.",
+    "Echo: LVEF 35-40%, moderate MR, no pericardial effusion.",
+    "Discharge meds: aspirin 81 mg daily, ticagrelor 90 mg BID,",
+    "atorvastatin 80 mg nightly, metoprolol succinate 50 mg daily,",
+    "sacubitril/valsartan 24/26 mg BID, furosemide 20 mg daily.",
+    "Follow-up: cardiology clinic in 2 weeks, cardiac rehab referral.",
+]
+
+
+@dataclass
+class CorpusImage:
+    name: str
+    data: bytes
+    dpi: Optional[int]
+    width: int
+    height: int
+
+
+def _page(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    paper = rng.integers(235, 256, size=(height, width), dtype=np.uint8)
+    return cv2.GaussianBlur(paper, (3, 3), 0)
+
+
+def _write_lines(img: np.ndarray, lines: List[str], scale: float, top: int = 0):
+    thickness = max(1, int(scale * 2))
+    step = int(40 * scale)
+    for i, line in enumerate(lines):
+        y = top + int(60 * scale) + i * step
+        cv2.putText(
+            img,
+            line,
+            (int(40 * scale), y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            scale,
+            0,
+            thickness,
+            cv2.LINE_AA,
+        )
+
+
+def discharge_summary(rng: np.random.Generator) -> np.ndarray:
+    # Letter page at 300 DPI
+    img = _page(2550, 3300, rng)
+    _write_lines(img, SUMMARY_LINES * 6, 1.6)
+    return img
+
+
+def lab_panel(rng: np.random.Generator) -> np.ndarray:
+    img = _page(2550, 3300, rng)
+    _write_lines(img, ["LABORATORY RESULTS", "Test  Result  Units  Reference"], 1.6)
+    rows = [" | ".join(row) for row in LAB_ROWS] * 4
+    _write_lines(img, rows, 1.4, top=200)
+    for y in range(300, 300 + len(rows) * 56, 56):
+        cv2.line(img, (50, y), (2500, y), 120, 2)
+    return img
+
+
+def ecg_strip(rng: np.random.Generator) -> np.ndarray:
+    img = _page(3300, 1200, rng)
+    # Red grid prints as mid-gray after grayscale conversion
+    img[::40, :] = 190
+    img[:, ::40] = 190
+    t = np.arange(img.shape[1])
+    beat = (np.abs((t % 260) - 130) < 4) * 380.0
+    trace = (600 - 40 * np.sin(t / 45.0) - beat).astype(np.int32)
+    points = np.column_stack([t, trace]).reshape(-1, 1, 2)
+    cv2.polylines(img, [points], False, 0, 3)
+    _write_lines(img, ["HR 72 bpm  PR 168 ms  QRS 92 ms  QTc 441 ms"], 1.4)
+    return img
+
+
+def phone_photo(rng: np.random.Generator) -> np.ndarray:
+    # 12 MP photo of a skewed page with uneven lighting and a dark surround
+    page = discharge_summary(rng)
+    canvas = np.full((3000, 4000), 40, dtype=np.uint8)
+    page = cv2.resize(page, (2200, 2850), interpolation=cv2.INTER_AREA)
+    canvas[75:2925, 900:3100] = page
+    matrix = cv2.getRotationMatrix2D((2000, 1500), 4.0, 1.0)
+    canvas = cv2.warpAffine(canvas, matrix, (4000, 3000), borderValue=40)
+    gradient = np.linspace(0.65, 1.0, canvas.shape[1], dtype=np.float32)
+    canvas = (canvas * gradient[None, :]).astype(np.uint8)
+    noise = rng.normal(0, 6, canvas.shape).astype(np.int16)
+    return np.clip(canvas.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def noisy_fax(rng: np.random.Generator) -> np.ndarray:
+    # 200 DPI fax with salt-and-pepper speckle
+    img = cv2.resize(lab_panel(rng), (1700, 2200), interpolation=cv2.INTER_AREA)
+    speckle = rng.random(img.shape)
+    img[speckle < 0.01] = 0
+    img[speckle > 0.99] = 255
+    return img
+
+
+GENERATORS: Dict[str, Callable[[np.random.Generator], np.ndarray]] = {
+    "discharge_summary_300dpi": discharge_summary,
+    "lab_panel_300dpi": lab_panel,
+    "ecg_strip": ecg_strip,
+    "phone_photo_12mp": phone_photo,
+    "noisy_fax_200dpi": noisy_fax,
+}
+
+DPI = {
+    "discharge_summary_300dpi": 300,
+    "lab_panel_300dpi": 300,
+    "ecg_strip": None,
+    "phone_photo_12mp": None,
+    "noisy_fax_200dpi": 200,
+}
+
+
+def encode(gray: np.ndarray, fmt: str = "PNG", dpi: Optional[int] = None) -> bytes:
+    buffer = io.BytesIO()
+    kwargs = {"dpi": (dpi, dpi)} if dpi else {}
+    if fmt == "JPEG":
+        kwargs["quality"] = 90
+    Image.fromarray(gray).save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def build_corpus(seed: int = 7, names: Optional[List[str]] = None) -> List[CorpusImage]:
+    """Generate the benchmark corpus; phone photos are JPEG, scans are PNG"""
+    corpus = []
+    for name in names or list(GENERATORS):
+        rng = np.random.default_rng(seed)
+        gray = GENERATORS[name](rng)
+        fmt = "JPEG" if name.startswith("phone") else "PNG"
+        corpus.append(
+            CorpusImage(
+                name=name,
+                data=encode(gray, fmt, DPI[name]),
+                dpi=DPI[name],
+                width=gray.shape[1],
+                height=gray.shape[0],
+            )
+        )
+    return corpus
+
+
+def multipage_tiff(seed: int = 7, pages: int = 4) -> bytes:
+    """A scanned packet: alternating discharge summary and lab pages"""
+    rng = np.random.default_rng(seed)
+    frames = [
+        Image.fromarray(discharge_summary(rng) if i % 2 == 0 else lab_panel(rng))
+        for i in range(pages)
+    ]
+    buffer = io.BytesIO()
+    frames[0].save(
+        buffer,
+        format="TIFF",
+        save_all=True,
+        append_images=frames[1:],
+        compression="tiff_deflate",
+        dpi=(300, 300),
+    )
+    return buffer.getvalue()